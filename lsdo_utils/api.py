@@ -1,6 +1,11 @@
 from lsdo_utils.comps.array_explicit_component import ArrayExplicitComponent
+from lsdo_utils.comps.fused_array_comp import FusedArrayComp
 from lsdo_utils.comps.bracketed_implicit_comp import BracketedImplicitComp
-from lsdo_utils.comps.bspline_comp import BsplineComp, get_bspline_mtx
+from lsdo_utils.comps.bspline_comp import BsplineComp, get_bspline_mtx, get_bspline_mtxs
+from lsdo_utils.comps.bspline_comp import get_cached_bspline_mtx, bspline_mtx_cache
+from lsdo_utils.comps.bspline_tensor_comp import BsplineTensorComp
+from lsdo_utils.comps.bspline_derivative_comp import BsplineDerivativeComp
+from lsdo_utils.comps.bspline_fit_comp import BsplineFitComp
 from lsdo_utils.comps.cross_product_comp import CrossProductComp
 
 from lsdo_utils.comps.arithmetic_comps.general_operation_comp import GeneralOperationComp
@@ -10,12 +15,14 @@ from lsdo_utils.comps.arithmetic_comps.linear_power_combination_comp import Line
 
 from lsdo_utils.comps.arithmetic_comps.elementwise_max_comp import ElementwiseMaxComp
 from lsdo_utils.comps.arithmetic_comps.elementwise_min_comp import ElementwiseMinComp
+from lsdo_utils.comps.arithmetic_comps.ks_comp import KSComp
 
 from lsdo_utils.comps.array_comps.array_reorder_comp import ArrayReorderComp
 from lsdo_utils.comps.array_comps.scalar_expansion_comp import ScalarExpansionComp
 from lsdo_utils.comps.array_comps.scalar_contraction_comp import ScalarContractionComp
 from lsdo_utils.comps.array_comps.array_expansion_comp import ArrayExpansionComp
 from lsdo_utils.comps.array_comps.array_contraction_comp import ArrayContractionComp
+from lsdo_utils.comps.array_comps.einsum_comp import EinsumComp
 
 from lsdo_utils.miscellaneous_functions.units import units
 from lsdo_utils.miscellaneous_functions.get_array_indices import get_array_indices
@@ -0,0 +1,109 @@
+import time
+
+import numpy as np
+import scipy.sparse
+
+from lsdo_utils.comps.bspline_comp import get_bspline_mtx
+
+
+def get_bspline_mtx_loop(num_cp, num_pt, order=4):
+    """
+    Reference per-point implementation that get_bspline_mtx replaced.
+    """
+    order = min(order, num_cp)
+
+    knots = np.zeros(num_cp + order)
+    knots[order-1:num_cp+1] = np.linspace(0, 1, num_cp - order + 2)
+    knots[num_cp+1:] = 1.0
+
+    t_vec = np.linspace(0, 1, num_pt)
+
+    basis = np.zeros(order)
+    arange = np.arange(order)
+    data = np.zeros((num_pt, order))
+    rows = np.zeros((num_pt, order), int)
+    cols = np.zeros((num_pt, order), int)
+
+    for ipt in range(num_pt):
+        t = t_vec[ipt]
+
+        i0 = -1
+        for ind in range(order, num_cp+1):
+            if (knots[ind-1] <= t) and (t < knots[ind]):
+                i0 = ind - order
+        if t == knots[-1]:
+            i0 = num_cp - order
+
+        basis[:] = 0.
+        basis[-1] = 1.
+
+        for i in range(2, order+1):
+            l = i - 1
+            j1 = order - l
+            j2 = order
+            n = i0 + j1
+            if knots[n+l] != knots[n]:
+                basis[j1-1] = (knots[n+l] - t) / \
+                              (knots[n+l] - knots[n]) * basis[j1]
+            else:
+                basis[j1-1] = 0.
+            for j in range(j1+1, j2):
+                n = i0 + j
+                if knots[n+l-1] != knots[n-1]:
+                    basis[j-1] = (t - knots[n-1]) / \
+                                (knots[n+l-1] - knots[n-1]) * basis[j-1]
+                else:
+                    basis[j-1] = 0.
+                if knots[n+l] != knots[n]:
+                    basis[j-1] += (knots[n+l] - t) / \
+                                  (knots[n+l] - knots[n]) * basis[j]
+            n = i0 + j2
+            if knots[n+l-1] != knots[n-1]:
+                basis[j2-1] = (t - knots[n-1]) / \
+                              (knots[n+l-1] - knots[n-1]) * basis[j2-1]
+            else:
+                basis[j2-1] = 0.
+
+        data[ipt, :] = basis
+        rows[ipt, :] = ipt
+        cols[ipt, :] = i0 + arange
+
+    data, rows, cols = data.flatten(), rows.flatten(), cols.flatten()
+
+    return scipy.sparse.csr_matrix(
+        (data, (rows, cols)),
+        shape=(num_pt, num_cp),
+    )
+
+
+def get_time(func, *args, repeat=3):
+    times = []
+    for ind in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    num_cp = 20
+    order = 4
+
+    print('{:>10} {:>12} {:>12} {:>10}'.format('num_pt', 'loop (s)', 'array (s)', 'speedup'))
+    for num_pt in [10 ** 2, 10 ** 3, 10 ** 4, 10 ** 5]:
+        mtx_loop = get_bspline_mtx_loop(num_cp, num_pt, order)
+        mtx = get_bspline_mtx(num_cp, num_pt, order)
+
+        assert np.array_equal(mtx.indptr, mtx_loop.indptr)
+        assert np.array_equal(mtx.indices, mtx_loop.indices)
+        assert np.array_equal(mtx.data, mtx_loop.data)
+
+        time_loop = get_time(get_bspline_mtx_loop, num_cp, num_pt, order)
+        time_array = get_time(get_bspline_mtx, num_cp, num_pt, order)
+
+        print('{:>10} {:>12.4e} {:>12.4e} {:>10.1f}'.format(
+            num_pt, time_loop, time_array, time_loop / time_array))
+
+    for num_pt in [10 ** 6]:
+        time_array = get_time(get_bspline_mtx, num_cp, num_pt, order)
+        print('{:>10} {:>12} {:>12.4e} {:>10}'.format(num_pt, '-', time_array, '-'))
@@ -0,0 +1,109 @@
+import time
+
+import numpy as np
+
+from lsdo_utils.comps.cross_product_comp import fill_cross_product_partials, insert_3_into_tuple
+
+
+def get_cross_product_partials_einsum(shape_no_3, in1_index, in2_index, in1, in2):
+    """
+    Reference implementation of the partials that CrossProductComp used to compute.
+    """
+    eye = np.eye(3)
+
+    tmps = {0: None, 1: None, 2: None}
+    for ind in range(3):
+        array = np.einsum(
+            '...,m->...m',
+            np.ones(shape_no_3),
+            eye[ind, :],
+        )
+
+        array = np.einsum(
+            '...,m->...m',
+            np.cross(
+                np.einsum(
+                    '...,m->...m',
+                    np.ones(shape_no_3),
+                    eye[ind, :],
+                ),
+                in2,
+                axisa=-1,
+                axisb=in2_index,
+                axisc=-1,
+            ),
+            eye[ind, :],
+        )
+
+        tmps[ind] = array
+
+    d_in1 = (tmps[0] + tmps[1] + tmps[2]).flatten()
+
+    tmps = {0: None, 1: None, 2: None}
+    for ind in range(3):
+        array = np.einsum(
+            '...,m->...m',
+            np.ones(shape_no_3),
+            eye[ind, :],
+        )
+
+        array = np.einsum(
+            '...,m->...m',
+            np.cross(
+                in1,
+                np.einsum(
+                    '...,m->...m',
+                    np.ones(shape_no_3),
+                    eye[ind, :],
+                ),
+                axisa=in1_index,
+                axisb=-1,
+                axisc=-1,
+            ),
+            eye[ind, :],
+        )
+
+        tmps[ind] = array
+
+    d_in2 = (tmps[0] + tmps[1] + tmps[2]).flatten()
+
+    return d_in1, d_in2
+
+
+def get_time(func, *args, repeat=3):
+    times = []
+    for ind in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    in1_index = 0
+    in2_index = 1
+
+    print('{:>10} {:>12} {:>12} {:>10}'.format('num_vec', 'einsum (s)', 'closed (s)', 'speedup'))
+    for num_vec in [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]:
+        shape_no_3 = (num_vec,)
+
+        in1 = np.random.rand(*insert_3_into_tuple(shape_no_3, in1_index))
+        in2 = np.random.rand(*insert_3_into_tuple(shape_no_3, in2_index))
+
+        d_in1 = np.zeros(shape_no_3 + (3, 3))
+        d_in2 = np.zeros(shape_no_3 + (3, 3))
+
+        ref_in1, ref_in2 = get_cross_product_partials_einsum(
+            shape_no_3, in1_index, in2_index, in1, in2)
+        fill_cross_product_partials(in1, in2, in1_index, in2_index, d_in1, d_in2)
+
+        assert np.array_equal(ref_in1, d_in1.reshape(-1))
+        assert np.array_equal(ref_in2, d_in2.reshape(-1))
+
+        time_einsum = get_time(
+            get_cross_product_partials_einsum, shape_no_3, in1_index, in2_index, in1, in2)
+        time_closed = get_time(
+            fill_cross_product_partials, in1, in2, in1_index, in2_index, d_in1, d_in2)
+
+        print('{:>10} {:>12.4e} {:>12.4e} {:>10.1f}'.format(
+            num_vec, time_einsum, time_closed, time_einsum / time_closed))
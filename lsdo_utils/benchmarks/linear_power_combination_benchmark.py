@@ -0,0 +1,129 @@
+import time
+
+import numpy as np
+
+from openmdao.api import Problem, IndepVarComp
+
+from lsdo_utils.comps.arithmetic_comps.linear_power_combination_comp import \
+    LinearPowerCombinationComp
+
+
+class LinearPowerCombinationLoopComp(LinearPowerCombinationComp):
+    """
+    Reference per-term, per-variable loops that LinearPowerCombinationComp replaced.
+    """
+
+    def compute(self, inputs, outputs):
+        in_names = self.options['in_names']
+        out_name = self.options['out_name']
+        powers = self.options['powers']
+        constant = self.options['constant']
+        coeffs = self.options['coeffs']
+
+        outputs[out_name] = constant
+        for iterm in range(powers.shape[0]):
+            term = coeffs[iterm] * np.ones(outputs[out_name].shape)
+            for ivar, in_name in enumerate(in_names):
+                power = powers[iterm, ivar]
+                term *= inputs[in_name] ** power
+
+            outputs[out_name] += term
+
+    def compute_partials(self, inputs, partials):
+        in_names = self.options['in_names']
+        out_name = self.options['out_name']
+        powers = self.options['powers']
+        coeffs = self.options['coeffs']
+
+        for in_name in in_names:
+            deriv = np.zeros(self.options['shape'])
+
+            for iterm in range(powers.shape[0]):
+                term = coeffs[iterm]
+                for ivar, in_name2 in enumerate(in_names):
+                    power = powers[iterm, ivar]
+
+                    a = 1.
+                    b = power
+                    if in_name == in_name2:
+                        a = power
+                        b = power - 1.
+
+                    term *= a * inputs[in_name2] ** b
+
+                deriv += term
+
+            partials[out_name, in_name] = deriv.flatten()
+
+
+def get_problem(comp_class, shape, num_terms, num_vars):
+    in_names = ['x{}'.format(ivar) for ivar in range(num_vars)]
+
+    # Polynomial exponents 0-3 over all variables, as in a cubic surrogate model.
+    powers = np.random.randint(0, 4, (num_terms, num_vars)).astype(float)
+    coeffs = np.random.rand(num_terms)
+
+    prob = Problem()
+
+    comp = IndepVarComp()
+    for in_name in in_names:
+        comp.add_output(in_name, val=np.random.rand(*shape) + 0.5)
+    prob.model.add_subsystem('ivc', comp, promotes=['*'])
+
+    comp = comp_class(
+        shape=shape,
+        out_name='f',
+        in_names=in_names,
+        powers=powers,
+        coeffs=coeffs,
+        constant=1.,
+    )
+    prob.model.add_subsystem('comp', comp, promotes=['*'])
+
+    prob.setup()
+    prob.run_model()
+
+    return prob
+
+
+def get_time(func, repeat=3):
+    times = []
+    for ind in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    num_vars = 6
+
+    print('{:>8} {:>8} {:>14} {:>14} {:>14} {:>14}'.format(
+        'size', 'terms', 'loop f (s)', 'table f (s)', 'loop df (s)', 'table df (s)'))
+    for size, num_terms in [(10 ** 4, 50), (10 ** 4, 200), (10 ** 5, 50), (10 ** 5, 200)]:
+        np.random.seed(0)
+        loop_prob = get_problem(LinearPowerCombinationLoopComp, (size,), num_terms, num_vars)
+        np.random.seed(0)
+        table_prob = get_problem(LinearPowerCombinationComp, (size,), num_terms, num_vars)
+
+        loop_comp = loop_prob.model.comp
+        table_comp = table_prob.model.comp
+
+        assert np.allclose(loop_prob['f'], table_prob['f'], rtol=1e-12)
+
+        loop_comp.run_linearize()
+        table_comp.run_linearize()
+        for in_name in table_comp.options['in_names']:
+            assert np.allclose(
+                loop_comp._subjacs_info['comp.f', 'comp.' + in_name]['val'],
+                table_comp._subjacs_info['comp.f', 'comp.' + in_name]['val'],
+                rtol=1e-12,
+            )
+
+        print('{:>8} {:>8} {:>14.4e} {:>14.4e} {:>14.4e} {:>14.4e}'.format(
+            size, num_terms,
+            get_time(loop_comp.run_apply_nonlinear),
+            get_time(table_comp.run_apply_nonlinear),
+            get_time(loop_comp.run_linearize),
+            get_time(table_comp.run_linearize),
+        ))
@@ -1,90 +1,22 @@
 import numpy as np
 
-from openmdao.core.explicitcomponent import ExplicitComponent
+from lsdo_utils.comps.arithmetic_comps.ks_comp import KSComp
 
 
-class AxisMinComp(ExplicitComponent):
+class AxisMinComp(KSComp):
+    """
+    KS aggregation over a single axis; see KSComp.
+    """
 
     def initialize(self):
-        self.options.declare('shape', types=tuple)
+        super(AxisMinComp, self).initialize()
         self.options.declare('axis', types=int)
-        self.options.declare('out_name', types=str)
-        self.options.declare('in_name', types=str)
-        self.options.declare('rho', 50.0, desc="Constraint Aggregation Factor.")
 
     def setup(self):
-        in_name = self.options['in_name']
-        out_name = self.options['out_name']
+        self.options['axes'] = self.options['axis']
+        self.options['lower'] = True
 
-        total_rank = len(self.options['shape'])
-
-        if self.options['axis'] < 0:
-            self.options['axis'] += total_rank
-
-        shape = self.options['shape']
-        axis = self.options['axis']
-
-        in_shape = tuple(shape)
-        out_shape = shape[:axis] + shape[axis+1:]
-
-        self.add_input(in_name, shape=in_shape)
-        self.add_output(out_name, shape=out_shape)
-
-        out_indices = np.arange(np.prod(out_shape)).reshape(out_shape)
-        in_indices = np.arange(np.prod(in_shape)).reshape(in_shape)
-
-        alphabet = 'abcdefghijkl'
-
-        self.einsum_str = einsum_str = '{},{}->{}'.format(
-            alphabet[:axis] + alphabet[axis+1:total_rank],
-            alphabet[axis],
-            alphabet[:total_rank],
-        )
-        self.ones = ones = np.ones(shape[axis])
-
-        rows = np.einsum(
-            einsum_str,
-            out_indices,
-            ones.astype(int),
-        ).flatten()
-        cols = in_indices.flatten()
-
-        self.declare_partials(of=out_name, wrt=in_name, rows=rows, cols=cols)
-
-    def compute(self, inputs, outputs):
-        in_name = self.options['in_name']
-        out_name = self.options['out_name']
-        shape = self.options['shape']
-        axis = self.options['axis']
-        rho = self.options['rho']
-
-        con_val = -inputs[in_name]
-
-        g_max = np.max(con_val, axis=axis)
-        g_diff = con_val - np.einsum(
-            self.einsum_str,
-            g_max,
-            self.ones,
-        )
-        exponents = np.exp(rho * g_diff)
-        summation = np.sum(exponents, axis=axis)
-        result = -g_max - 1.0 / rho * np.log(summation)
-        outputs[out_name] = result
-
-        dsum_dg = rho * exponents
-        dKS_dsum = 1.0 / (rho * np.einsum(
-            self.einsum_str,
-            summation,
-            self.ones,
-        ))
-        dKS_dg = dKS_dsum * dsum_dg
-
-        self.dKS_dg = dKS_dg
-
-    def compute_partials(self, inputs, partials):
-        in_name = self.options['in_name']
-        out_name = self.options['out_name']
-        partials[out_name, in_name] = self.dKS_dg.flatten()
+        super(AxisMinComp, self).setup()
 
 
 if __name__ == '__main__':
@@ -1,13 +1,27 @@
 import numpy as np
 from lsdo_utils.comps.array_explicit_component import ArrayExplicitComponent
+from lsdo_utils.miscellaneous.numba_kernels import get_use_numba, log_sum_exp_kernel
 
 
 class ElementwiseMaxComp(ArrayExplicitComponent):
+    """
+    Smooth elementwise maximum of several arrays, by the stabilized log-sum-exp.
+
+    The inputs are stacked into one (num_inputs, size) buffer, and compute evaluates the
+    log-sum-exp and the softmax weights, which are the partials, in a single pass;
+    compute_partials reuses them unless the inputs have changed since. With use_numba (or
+    the global setting, if None), the pass over the stacked inputs is a Numba kernel. It is
+    off by default, even when Numba is enabled globally, since this pass is bound by exp,
+    which NumPy vectorizes better: on one core, the kernel is slower than NumPy.
+    """
+
+    sign = 1.
 
     def array_initialize(self):
         self.options.declare('in_names', types=list)
         self.options.declare('out_name', types=str)
         self.options.declare('rho', types=float)
+        self.options.declare('use_numba', default=False, types=bool, allow_none=True)
 
     def array_setup(self):
         in_names = self.options['in_names']
@@ -18,40 +32,84 @@ class ElementwiseMaxComp(ArrayExplicitComponent):
         self.array_add_output(out_name)
         self.array_declare_partials('*', '*')
 
-    def compute(self, inputs, outputs):
+        # Stacked inputs, softmax weights and work arrays, keyed by dtype for complex step.
+        self.buffers = {}
+        self.stacked = None
+
+    def _get_buffers(self, dtype):
+        if dtype not in self.buffers:
+            shape = (len(self.options['in_names']), self.var_size)
+            self.buffers[dtype] = (
+                np.empty(shape, dtype), np.empty(shape, dtype),
+                np.empty(self.var_size, dtype), np.empty(self.var_size, dtype),
+            )
+
+        return self.buffers[dtype]
+
+    def _inputs_unchanged(self, inputs):
+        # The stacked buffer holds the inputs of the last evaluation.
+        if self.stacked is None:
+            return False
+
+        for index, in_name in enumerate(self.options['in_names']):
+            if inputs[in_name].dtype != self.stacked.dtype:
+                return False
+            if not np.array_equal(inputs[in_name].reshape(-1), self.stacked[index]):
+                return False
+
+        return True
+
+    def _evaluate(self, inputs):
         in_names = self.options['in_names']
-        out_name = self.options['out_name']
         rho = self.options['rho']
+        sign = self.sign
 
-        fmax = inputs[in_names[0]] - 1
-        for in_name in in_names:
-            fmax = np.maximum(fmax, inputs[in_name])
+        dtype = np.result_type(*[inputs[in_name] for in_name in in_names])
+        stacked, weights, fmax, arg = self._get_buffers(dtype)
 
-        arg = 0.
-        for in_name in in_names:
-            arg += np.exp(rho * (inputs[in_name] - fmax))
+        for index, in_name in enumerate(in_names):
+            stacked[index] = inputs[in_name].reshape(-1)
+
+        self.stacked = stacked
+        self.weights = weights
 
-        outputs[out_name] = (
-            fmax + 1. / rho * np.log(arg)
-        )
+        if get_use_numba(self.options['use_numba'], stacked):
+            log_sum_exp_kernel(stacked, rho, sign, fmax, weights)
+            return fmax
+
+        # The operations run one row at a time, so each stays in cache.
+        reduce_func = np.maximum if sign > 0 else np.minimum
+        fmax[:] = stacked[0]
+        for row in stacked[1:]:
+            reduce_func(fmax, row, out=fmax)
+        fmax *= sign
+
+        arg[:] = 0.
+        for row, weights_row in zip(stacked, weights):
+            np.multiply(row, sign, out=weights_row)
+            weights_row -= fmax
+            weights_row *= rho
+            np.exp(weights_row, out=weights_row)
+            arg += weights_row
+
+        weights /= arg
+
+        return sign * (fmax + 1. / rho * np.log(arg))
+
+    def compute(self, inputs, outputs):
+        out_name = self.options['out_name']
+
+        outputs[out_name] = self._evaluate(inputs).reshape(self.var_shape)
 
     def compute_partials(self, inputs, partials):
         in_names = self.options['in_names']
         out_name = self.options['out_name']
-        rho = self.options['rho']
-
-        fmax = inputs[in_names[0]] - 1
-        for in_name in in_names:
-            fmax = np.maximum(fmax, inputs[in_name])
 
-        arg = 0.
-        for in_name in in_names:
-            arg += np.exp(rho * (inputs[in_name] - fmax))
+        if not self._inputs_unchanged(inputs):
+            self._evaluate(inputs)
 
-        for in_name in in_names:
-            partials[out_name, in_name] = (
-                    1. / arg * np.exp(rho * (inputs[in_name] - fmax))
-            ).flatten()
+        for index, in_name in enumerate(in_names):
+            partials[out_name, in_name] = self.weights[index]
 
 
 if __name__ == '__main__':
@@ -1,57 +1,15 @@
 import numpy as np
-from lsdo_utils.comps.array_explicit_component import ArrayExplicitComponent
 
+from lsdo_utils.comps.arithmetic_comps.elementwise_max_comp import ElementwiseMaxComp
 
-class ElementwiseMinComp(ArrayExplicitComponent):
 
-    def array_initialize(self):
-        self.options.declare('in_names', types=list)
-        self.options.declare('out_name', types=str)
-        self.options.declare('rho', types=float)
+class ElementwiseMinComp(ElementwiseMaxComp):
+    """
+    Smooth elementwise minimum of several arrays, as the negated smooth maximum of the
+    negated inputs.
+    """
 
-    def array_setup(self):
-        in_names = self.options['in_names']
-        out_name = self.options['out_name']
-
-        for in_name in in_names:
-            self.array_add_input(in_name)
-        self.array_add_output(out_name)
-        self.array_declare_partials('*', '*')
-
-    def compute(self, inputs, outputs):
-        in_names = self.options['in_names']
-        out_name = self.options['out_name']
-        rho = self.options['rho']
-
-        fmax = -inputs[in_names[0]] - 1
-        for in_name in in_names:
-            fmax = np.maximum(fmax, -inputs[in_name])
-
-        arg = 0.
-        for in_name in in_names:
-            arg += np.exp(rho * (-inputs[in_name] - fmax))
-
-        outputs[out_name] = -(
-            fmax + 1. / rho * np.log(arg)
-        )
-
-    def compute_partials(self, inputs, partials):
-        in_names = self.options['in_names']
-        out_name = self.options['out_name']
-        rho = self.options['rho']
-
-        fmax = -inputs[in_names[0]] - 1
-        for in_name in in_names:
-            fmax = np.maximum(fmax, -inputs[in_name])
-
-        arg = 0.
-        for in_name in in_names:
-            arg += np.exp(rho * (-inputs[in_name] - fmax))
-
-        for in_name in in_names:
-            partials[out_name, in_name] = (
-                    1. / arg * np.exp(rho * (-inputs[in_name] - fmax))
-            ).flatten()
+    sign = -1.
 
 
 if __name__ == '__main__':
@@ -2,45 +2,127 @@ import numpy as np
 
 from lsdo_utils.comps.array_explicit_component import ArrayExplicitComponent
 from lsdo_utils.miscellaneous_functions.process_options import name_types, get_names_list
+from lsdo_utils.miscellaneous_functions.compile_expression import compile_expression, \
+    get_expression_names
 
 function_type = type(lambda : None)
 
 class GeneralOperationComp(ArrayExplicitComponent):
+    """
+    Elementwise output given either by func and its derivatives deriv, or by an expression
+    string expr, e.g., '0.5*rho*v**2*S*CL'.
+
+    If deriv is omitted, func must be complex-safe and the partials are computed by complex
+    step: since the Jacobian is diagonal, all the partials with respect to an input come
+    from one call of func with that input perturbed everywhere at once, with the perturbed
+    input written into a complex buffer reused between calls.
+
+    An expression is parsed once in setup and its partials are derived symbolically, with
+    the subexpressions shared between the value and the partials evaluated once; in_names
+    defaults to its variables. The value and all the partials are evaluated in one pass in
+    compute, with numexpr if it is installed (or as set by backend) and NumPy otherwise.
+    """
 
     def array_initialize(self):
-        self.options.declare('in_names', types=name_types)
+        self.options.declare('in_names', default=None, types=name_types, allow_none=True)
         self.options.declare('out_name', types=str)
-        self.options.declare('func', types=function_type)
-        self.options.declare('deriv', types=function_type)
+        self.options.declare('func', default=None, types=function_type, allow_none=True)
+        self.options.declare('deriv', default=None, types=function_type, allow_none=True)
+        self.options.declare('expr', default=None, types=str, allow_none=True)
+        self.options.declare('backend', default=None, values=['numexpr', 'numpy', None])
 
     def array_setup(self):
+        expr = self.options['expr']
+
+        if expr is None:
+            if self.options['func'] is None:
+                raise ValueError('GeneralOperationComp requires either expr or func')
+            if self.options['in_names'] is None:
+                raise ValueError('GeneralOperationComp requires in_names with func')
+        elif self.options['in_names'] is None:
+            self.options['in_names'] = get_expression_names(expr)
+
         self.options['in_names'] = get_names_list(self.options['in_names'])
 
         in_names = self.options['in_names']
         out_name = self.options['out_name']
-        func = self.options['func']
-        deriv = self.options['deriv']
+
+        self.complex_step = 1e-30
+        self.complex_buffer = None
+
+        self.expression = None
+        if expr is not None:
+            self.expression = compile_expression(
+                expr, in_names, int(self.var_size), self.options['backend'])
 
         self.array_add_output(out_name)
         for in_name in in_names:
             self.array_add_input(in_name)
             self.array_declare_partials(out_name, in_name)
 
+    def _evaluate_expression(self, inputs):
+        in_names = self.options['in_names']
+
+        self.expression_results = self.expression.evaluate(
+            [inputs[in_name].reshape(-1) for in_name in in_names])
+        self.array_cache_inputs(inputs)
+
     def compute(self, inputs, outputs):
         in_names = self.options['in_names']
         out_name = self.options['out_name']
-        
+
+        if self.expression is not None:
+            self._evaluate_expression(inputs)
+            outputs[out_name] = np.reshape(
+                np.broadcast_to(self.expression_results[0], (self.var_size,)), self.var_shape)
+            return
+
         outputs[out_name] = self.options['func'](*[inputs[in_name] for in_name in in_names])
 
     def compute_partials(self, inputs, partials):
         in_names = self.options['in_names']
         out_name = self.options['out_name']
 
+        if self.expression is not None:
+            if not self.array_inputs_unchanged(inputs):
+                self._evaluate_expression(inputs)
+
+            for ind, in_name in enumerate(in_names):
+                partials[out_name, in_name] = np.broadcast_to(
+                    self.expression_results[ind + 1], (self.var_size,))
+            return
+
+        if self.options['deriv'] is None:
+            self._compute_complex_step_partials(inputs, partials)
+            return
+
         result = self.options['deriv'](*[inputs[in_name].flatten() for in_name in in_names])
 
         for ind, in_name in enumerate(in_names):
             partials[out_name, in_name] = result[ind]
 
+    def _compute_complex_step_partials(self, inputs, partials):
+        in_names = self.options['in_names']
+        out_name = self.options['out_name']
+        func = self.options['func']
+        step = self.complex_step
+
+        if self.complex_buffer is None:
+            self.complex_buffer = np.empty(self.var_shape, complex)
+        buffer = self.complex_buffer
+
+        args = [inputs[in_name] for in_name in in_names]
+        for ind, in_name in enumerate(in_names):
+            buffer.real = args[ind]
+            buffer.imag = step
+
+            args[ind] = buffer
+            result = func(*args)
+            args[ind] = inputs[in_name]
+
+            partials[out_name, in_name] = np.broadcast_to(
+                np.imag(result) / step, self.var_shape).reshape(-1)
+
 
 if __name__ == '__main__':
     from openmdao.api import Problem, IndepVarComp
@@ -75,8 +157,39 @@ if __name__ == '__main__':
     )
     prob.model.add_subsystem('comp', comp, promotes=['*'])
 
+    def cs_func(x, y, z):
+        return x * np.exp(y) / z
+
+    comp = GeneralOperationComp(
+        shape=shape,
+        in_names=['x', 'y', 'z'],
+        out_name='e',
+        func=cs_func,
+    )
+    prob.model.add_subsystem('cs_comp', comp, promotes=['*'])
+
+    comp = GeneralOperationComp(
+        shape=shape,
+        out_name='g',
+        expr='0.5 * x * y ** 2 * z + sin(x * y) / z + exp(-x * y)',
+    )
+    prob.model.add_subsystem('expr_comp', comp, promotes=['*'])
+
+    comp = GeneralOperationComp(
+        shape=shape,
+        out_name='h',
+        expr='sqrt(x ** 2 + y ** 2) * log(z) + x ** y',
+        backend='numpy',
+        matrix_free=True,
+    )
+    prob.model.add_subsystem('expr_numpy_comp', comp, promotes=['*'])
+
     prob.setup(check=True)
     prob.run_model()
     prob.check_partials(compact_print=True)
 
-    print(prob['x'] * prob['y'] * prob['z'] - prob['f'])
\ No newline at end of file
+    x, y, z = prob['x'], prob['y'], prob['z']
+    print(x * y * z - prob['f'])
+    print(x * np.exp(y) / z - prob['e'])
+    print(0.5 * x * y ** 2 * z + np.sin(x * y) / z + np.exp(-x * y) - prob['g'])
+    print(np.sqrt(x ** 2 + y ** 2) * np.log(z) + x ** y - prob['h'])
\ No newline at end of file
@@ -0,0 +1,280 @@
+import numpy as np
+
+from openmdao.api import ExplicitComponent
+
+from lsdo_utils.miscellaneous_functions.get_grid_indices import get_grid_indices
+from lsdo_utils.miscellaneous.numba_kernels import get_use_numba, ks_kernel, ks_partials_kernel
+
+
+class KSComp(ExplicitComponent):
+    """
+    Kreisselmeier-Steinhauser (smooth max, or smooth min if lower) aggregation of an array
+    over any set of axes; axes=None aggregates over all of them to a scalar.
+
+    The input is processed in chunks of at most chunk_size entries (or one index of the last
+    axis, if that is longer), taken over the flattened input whatever its shape, with a
+    streaming log-sum-exp across the chunks, so the only full-size arrays are the input and
+    the partials. The partials are the softmax weights, exp(rho * (x - KS)), and are written
+    chunk by chunk into the stored partials; in matrix_free mode, they are not stored but
+    recomputed chunk by chunk in the Jacobian-vector products. The KS values are reused in
+    compute_partials and the Jacobian-vector products as long as the input is unchanged.
+
+    With use_numba (or the global setting, if None), compute and compute_partials instead
+    run Numba kernels over the input viewed as (kept size, aggregated size), which is only
+    copied if the aggregated axes are not the last ones. They are off by default, even when
+    Numba is enabled globally, since they are bound by exp, which NumPy vectorizes better:
+    on one core, they are slower than the NumPy code.
+    """
+
+    def initialize(self):
+        self.options.declare('shape', types=tuple)
+        self.options.declare('axes', default=None, types=(int, tuple, list), allow_none=True)
+        self.options.declare('in_name', types=str)
+        self.options.declare('out_name', types=str)
+        self.options.declare('rho', default=50., types=(int, float))
+        self.options.declare('lower', default=False, types=bool)
+        self.options.declare('chunk_size', default=2 ** 20, types=int)
+        self.options.declare('matrix_free', default=False, types=bool)
+        self.options.declare('use_numba', default=False, types=bool, allow_none=True)
+
+    def setup(self):
+        shape = self.options['shape']
+        axes = self.options['axes']
+        in_name = self.options['in_name']
+        out_name = self.options['out_name']
+        chunk_size = self.options['chunk_size']
+
+        rank = len(shape)
+        if rank == 0:
+            raise ValueError('KSComp requires an input of rank 1 or more')
+
+        if axes is None:
+            axes = range(rank)
+        elif isinstance(axes, int):
+            axes = [axes]
+        self.axes = axes = tuple(sorted(axis % rank for axis in axes))
+        kept_axes = [axis for axis in range(rank) if axis not in axes]
+
+        self.kept_axes = kept_axes
+        self.out_shape = tuple(shape[axis] for axis in kept_axes)
+        self.keepdims_shape = tuple(1 if axis in axes else shape[axis] for axis in range(rank))
+
+        # The chunks are slices of the first axis whose trailing block fits in chunk_size,
+        # taken at each index of the axes before it.
+        self.chunk_axis = rank - 1
+        while self.chunk_axis > 0 and int(np.prod(shape[self.chunk_axis:])) <= chunk_size:
+            self.chunk_axis -= 1
+        self.chunk_rows = max(1, chunk_size // int(np.prod(shape[self.chunk_axis + 1:])))
+        self.sign = -1. if self.options['lower'] else 1.
+
+        self.add_input(in_name, shape=shape)
+        self.add_output(out_name, shape=self.out_shape)
+
+        # Inputs and KS values in the keepdims shape of the last evaluation, keyed by dtype
+        # for complex step.
+        self.ks_inputs = {}
+        self.ks_keepdims = {}
+
+        self.matrix_free = self.options['matrix_free']
+        if self.matrix_free:
+            return
+
+        rows = get_grid_indices(shape, kept_axes)
+        cols = get_grid_indices(shape)
+        self.declare_partials(out_name, in_name, rows=rows, cols=cols)
+
+    def _iter_chunks(self):
+        # Yields the indices of each chunk in the input and in the keepdims output.
+        shape = self.options['shape']
+        axis = self.chunk_axis
+
+        for lead in np.ndindex(*shape[:axis]):
+            lead_index = tuple(slice(ind, ind + 1) for ind in lead)
+            out_lead_index = tuple(
+                slice(None) if lead_axis in self.axes else lead_index[lead_axis]
+                for lead_axis in range(axis)
+            )
+
+            for start in range(0, shape[axis], self.chunk_rows):
+                rows = slice(start, start + self.chunk_rows)
+                in_index = lead_index + (rows,)
+                out_index = out_lead_index + (slice(None) if axis in self.axes else rows,)
+                yield in_index, out_index
+
+    def _get_ks_keepdims(self, array):
+        rho = self.options['rho']
+        sign = self.sign
+        axes = self.axes
+
+        fmax = np.full(self.keepdims_shape, -np.inf, array.dtype)
+        arg = np.zeros(self.keepdims_shape, array.dtype)
+
+        for in_index, out_index in self._iter_chunks():
+            chunk = sign * array[in_index]
+            chunk_max = np.max(chunk, axis=axes, keepdims=True)
+
+            # Streaming update of the log-sum-exp with a shifted reference maximum.
+            old_fmax = fmax[out_index]
+            new_fmax = np.maximum(old_fmax, chunk_max)
+            arg[out_index] *= np.exp(rho * (old_fmax - new_fmax))
+            fmax[out_index] = new_fmax
+
+            chunk -= new_fmax
+            chunk *= rho
+            np.exp(chunk, out=chunk)
+            arg[out_index] += np.sum(chunk, axis=axes, keepdims=True)
+
+        return sign * (fmax + 1. / rho * np.log(arg))
+
+    def _get_numba_array(self, array):
+        # The input with the aggregated axes moved last, as a (kept size, aggregated size)
+        # array.
+        moved = np.moveaxis(array, self.axes, range(len(self.kept_axes), array.ndim))
+        return np.ascontiguousarray(moved).reshape(int(np.prod(self.out_shape)), -1)
+
+    def _get_derivs_chunk(self, array, ks_keepdims, in_index, out_index):
+        chunk = array[in_index] - ks_keepdims[out_index]
+        chunk *= self.sign * self.options['rho']
+        return np.exp(chunk, out=chunk)
+
+    def _evaluate(self, array):
+        if get_use_numba(self.options['use_numba'], array):
+            ks = np.empty(int(np.prod(self.out_shape)))
+            ks_kernel(self._get_numba_array(array), self.options['rho'], self.sign, ks)
+            ks_keepdims = ks.reshape(self.keepdims_shape)
+        else:
+            ks_keepdims = self._get_ks_keepdims(array)
+
+        cached_array = self.ks_inputs.get(array.dtype)
+        if cached_array is None:
+            self.ks_inputs[array.dtype] = np.array(array)
+        else:
+            np.copyto(cached_array, array)
+        self.ks_keepdims[array.dtype] = ks_keepdims
+
+        return ks_keepdims
+
+    def _get_stored_ks_keepdims(self, array):
+        cached_array = self.ks_inputs.get(array.dtype)
+        if cached_array is None or not np.array_equal(array, cached_array):
+            return self._evaluate(array)
+
+        return self.ks_keepdims[array.dtype]
+
+    def compute(self, inputs, outputs):
+        in_name = self.options['in_name']
+        out_name = self.options['out_name']
+
+        outputs[out_name] = self._evaluate(inputs[in_name]).reshape(self.out_shape)
+
+    def compute_partials(self, inputs, partials):
+        if self.matrix_free:
+            return
+
+        shape = self.options['shape']
+        in_name = self.options['in_name']
+        out_name = self.options['out_name']
+
+        array = inputs[in_name]
+        ks_keepdims = self._get_stored_ks_keepdims(array)
+
+        # The partials are written in place, in the shape of the input.
+        derivs = np.reshape(partials[out_name, in_name], shape)
+
+        if get_use_numba(self.options['use_numba'], array):
+            numba_array = self._get_numba_array(array)
+            num_kept = len(self.kept_axes)
+            if self.axes == tuple(range(num_kept, array.ndim)):
+                ks_partials_kernel(
+                    numba_array, ks_keepdims.reshape(-1), self.options['rho'], self.sign,
+                    derivs.reshape(numba_array.shape))
+            else:
+                numba_derivs = np.empty(numba_array.shape)
+                ks_partials_kernel(
+                    numba_array, ks_keepdims.reshape(-1), self.options['rho'], self.sign,
+                    numba_derivs)
+
+                moved_shape = self.out_shape + tuple(shape[axis] for axis in self.axes)
+                derivs[...] = np.moveaxis(
+                    numba_derivs.reshape(moved_shape), range(num_kept, array.ndim), self.axes)
+        else:
+            for in_index, out_index in self._iter_chunks():
+                derivs[in_index] = self._get_derivs_chunk(
+                    array, ks_keepdims, in_index, out_index)
+
+    def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
+        in_name = self.options['in_name']
+        out_name = self.options['out_name']
+
+        if out_name not in d_outputs or in_name not in d_inputs:
+            return
+
+        array = inputs[in_name]
+        ks_keepdims = self._get_stored_ks_keepdims(array)
+
+        if mode == 'fwd':
+            d_in = d_inputs[in_name]
+            d_out = np.zeros(self.keepdims_shape, np.result_type(d_in, array))
+            for in_index, out_index in self._iter_chunks():
+                derivs = self._get_derivs_chunk(array, ks_keepdims, in_index, out_index)
+                derivs *= d_in[in_index]
+                d_out[out_index] += np.sum(derivs, axis=self.axes, keepdims=True)
+
+            d_outputs[out_name] += d_out.reshape(self.out_shape)
+        else:
+            d_out = np.reshape(d_outputs[out_name], self.keepdims_shape)
+            d_in = d_inputs[in_name]
+            for in_index, out_index in self._iter_chunks():
+                derivs = self._get_derivs_chunk(array, ks_keepdims, in_index, out_index)
+                derivs *= d_out[out_index]
+                d_in[in_index] += derivs
+
+
+if __name__ == '__main__':
+    from openmdao.api import Problem, IndepVarComp
+
+    shape = (20, 3, 5)
+
+    prob = Problem()
+
+    comp = IndepVarComp()
+    comp.add_output('x', val=np.random.rand(*shape))
+    comp.add_output('v', val=np.random.rand(1, 6, 5))
+    prob.model.add_subsystem('ivc', comp, promotes=['*'])
+
+    comp = KSComp(
+        in_name='x',
+        out_name='y',
+        shape=shape,
+        axes=(0, 2),
+        rho=100.,
+        chunk_size=32,
+    )
+    prob.model.add_subsystem('ks_max_comp', comp, promotes=['*'])
+
+    comp = KSComp(
+        in_name='x',
+        out_name='z',
+        shape=shape,
+        lower=True,
+        matrix_free=True,
+    )
+    prob.model.add_subsystem('ks_min_comp', comp, promotes=['*'])
+
+    # A short leading axis, so the chunks are taken along the last one.
+    comp = KSComp(
+        in_name='v',
+        out_name='w',
+        shape=(1, 6, 5),
+        axes=(0, 2),
+        rho=100.,
+        chunk_size=4,
+    )
+    prob.model.add_subsystem('ks_chunked_comp', comp, promotes=['*'])
+
+    prob.setup()
+    prob.run_model()
+    prob.check_partials(compact_print=True)
+    print(prob['y'], np.max(prob['x'], axis=(0, 2)))
+    print(prob['z'], np.min(prob['x']))
+    print(prob['w'], np.max(prob['v'], axis=(0, 2)))
@@ -6,6 +6,14 @@ from lsdo_utils.miscellaneous_functions.process_options import scalar_types, get
 
 
 class LinearCombinationComp(ArrayExplicitComponent):
+    """
+    Linear combination of the inputs, constant + sum_i coeffs[i] * x_i.
+
+    Each coefficient is a scalar or an array of the variable shape. By default, the sum is
+    accumulated in place into a preallocated buffer, with one scratch array for the scaled
+    inputs. With stacked, which requires scalar coefficients, the inputs are copied into a
+    preallocated (num_inputs, size) buffer and combined by a single matrix-vector product.
+    """
 
     def array_initialize(self):
         self.options.declare('out_name', types=str)
@@ -13,6 +21,7 @@ class LinearCombinationComp(ArrayExplicitComponent):
         self.options.declare('coeffs', default=1., types=scalar_types)
         self.options.declare('coeffs_dict', default=None, types=dict, allow_none=True)
         self.options.declare('constant', default=0., types=(int, float, np.ndarray))
+        self.options.declare('stacked', default=False, types=bool)
 
         self.post_initialize()
 
@@ -41,20 +50,65 @@ class LinearCombinationComp(ArrayExplicitComponent):
         coeffs = self.options['coeffs']
         constant = self.options['constant']
 
+        if len(coeffs) != len(in_names):
+            raise ValueError('Got {} coeffs for {} inputs'.format(len(coeffs), len(in_names)))
+
+        # Flattened per-element coefficients and constant; scalars are kept as floats.
+        self.coeffs = []
+        for coeff in coeffs:
+            if np.size(coeff) == 1:
+                self.coeffs.append(float(np.reshape(coeff, ())))
+            else:
+                self.coeffs.append(np.broadcast_to(coeff, self.var_shape).reshape(-1))
+        self.constant = np.broadcast_to(constant, self.var_shape).reshape(-1)
+
+        if self.options['stacked']:
+            if not all(isinstance(coeff, float) for coeff in self.coeffs):
+                raise ValueError('The stacked mode requires scalar coefficients')
+            self.coeffs_vector = np.array(self.coeffs)
+
         self.array_add_output(out_name)
-        for in_name, coeff in zip(in_names, coeffs):
+        for in_name, coeff in zip(in_names, self.coeffs):
             self.array_add_input(in_name)
             self.array_declare_partials(out_name, in_name, val=coeff)
 
+        # Output, scratch and stacked buffers, keyed by dtype for complex step.
+        self.buffers = {}
+
+    def _get_buffers(self, dtype):
+        if dtype not in self.buffers:
+            num_stacked = len(self.coeffs) if self.options['stacked'] else 0
+            self.buffers[dtype] = (
+                np.empty(self.var_size, dtype),
+                np.empty(self.var_size, dtype),
+                np.empty((num_stacked, self.var_size), dtype),
+            )
+
+        return self.buffers[dtype]
+
     def compute(self, inputs, outputs):
         in_names = self.options['in_names']
         out_name = self.options['out_name']
-        coeffs = self.options['coeffs']
-        constant = self.options['constant']
-        
-        outputs[out_name] = constant
-        for in_name, coeff in zip(in_names, coeffs):
-            outputs[out_name] += coeff * inputs[in_name]
+
+        dtype = np.result_type(self.constant, *[inputs[in_name] for in_name in in_names])
+        out, scratch, stacked = self._get_buffers(dtype)
+
+        if self.options['stacked']:
+            for index, in_name in enumerate(in_names):
+                stacked[index] = inputs[in_name].reshape(-1)
+
+            np.dot(self.coeffs_vector, stacked, out=out)
+            out += self.constant
+        else:
+            out[:] = self.constant
+            for in_name, coeff in zip(in_names, self.coeffs):
+                if isinstance(coeff, float) and coeff == 1.:
+                    out += inputs[in_name].reshape(-1)
+                else:
+                    np.multiply(inputs[in_name].reshape(-1), coeff, out=scratch)
+                    out += scratch
+
+        outputs[out_name] = out.reshape(self.var_shape)
 
 
 if __name__ == '__main__':
@@ -80,8 +134,30 @@ if __name__ == '__main__':
     )
     prob.model.add_subsystem('comp', comp, promotes=['*'])
 
+    comp = LinearCombinationComp(
+        shape=shape,
+        in_names=['x', 'y', 'z'],
+        out_name='g',
+        coeffs=[1., -2., 3.],
+        constant=1.5,
+        stacked=True,
+    )
+    prob.model.add_subsystem('stacked_comp', comp, promotes=['*'])
+
+    comp = LinearCombinationComp(
+        shape=shape,
+        out_name='h',
+        coeffs_dict=dict(
+            x=np.linspace(0., 1., 24).reshape(shape),
+            y=-2.,
+        ),
+    )
+    prob.model.add_subsystem('array_coeffs_comp', comp, promotes=['*'])
+
     prob.setup(check=True)
     prob.run_model()
     prob.check_partials(compact_print=True)
 
-    print(1.5 + 1 * prob['x'] - 2 * prob['y'] + 3 * prob['z'] - prob['f'])
\ No newline at end of file
+    print(1.5 + 1 * prob['x'] - 2 * prob['y'] + 3 * prob['z'] - prob['f'])
+    print(prob['f'] - prob['g'])
+    print(np.linspace(0., 1., 24).reshape(shape) * prob['x'] - 2 * prob['y'] - prob['h'])
\ No newline at end of file
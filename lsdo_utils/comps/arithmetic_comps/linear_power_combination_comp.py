@@ -3,9 +3,24 @@ import numpy as np
 from lsdo_utils.comps.array_explicit_component import ArrayExplicitComponent
 from lsdo_utils.miscellaneous_functions.process_options import name_types, get_names_list
 from lsdo_utils.miscellaneous_functions.process_options import scalar_types, get_scalars_list
+from lsdo_utils.miscellaneous.numba_kernels import get_use_numba, numba_options, \
+    linear_power_combination_kernel, linear_power_combination_partials_kernel
 
 
 class LinearPowerCombinationComp(ArrayExplicitComponent):
+    """
+    Polynomial-like sum of terms, constant + sum_t coeffs[t] * prod_v x_v ** powers[t, v].
+
+    Each input is raised once to each distinct exponent that appears in its column of
+    powers, and to those exponents minus one for the partials; these power tables are
+    cached. Terms are then gathered from the tables and multiplied as stacked
+    (num_terms, chunk_size) arrays, and summed with a matrix-vector product with the
+    coefficients; the partials use prefix and suffix products over the inputs. The
+    elements are processed in chunks of chunk_size to bound the memory of the stacks.
+
+    With use_numba (or the global setting, if None), the products and sums over the terms
+    run as Numba kernels on the same power tables instead.
+    """
 
     def array_initialize(self):
         self.options.declare('out_name', types=str)
@@ -14,6 +29,8 @@ class LinearPowerCombinationComp(ArrayExplicitComponent):
         self.options.declare('terms_list', default=None, types=list, allow_none=True)
         self.options.declare('constant', default=0., types=(int, float, np.ndarray))
         self.options.declare('coeffs', default=None, types=(list, np.ndarray), allow_none=True)
+        self.options.declare('chunk_size', default=None, types=int, allow_none=True)
+        self.options.declare('use_numba', default=None, types=bool, allow_none=True)
 
         self.post_initialize()
 
@@ -59,53 +76,160 @@ class LinearPowerCombinationComp(ArrayExplicitComponent):
 
         in_names = self.options['in_names']
         out_name = self.options['out_name']
+        powers = np.asarray(self.options['powers'], dtype=float)
+        coeffs = np.asarray(self.options['coeffs'], dtype=float)
 
         self.array_add_output(out_name)
         for in_name in in_names:
             self.array_add_input(in_name)
             self.array_declare_partials(out_name, in_name)
 
-    def compute(self, inputs, outputs):
+        num_terms, num_vars = powers.shape
+
+        # Rows of the stacked power tables: for each input, the distinct exponents of its
+        # column of powers and, for the partials, those exponents minus one. A zero power
+        # maps its derivative row to the exponent 0, since its coefficient is zero anyway.
+        table_vars = []
+        table_exponents = []
+        self.value_rows = np.empty((num_terms, num_vars), int)
+        self.deriv_rows = np.empty((num_terms, num_vars), int)
+        for ivar in range(num_vars):
+            column = powers[:, ivar]
+            deriv_column = np.where(column != 0., column - 1., 0.)
+            exponents = np.unique(np.concatenate([[0.], column, deriv_column]))
+
+            offset = len(table_exponents)
+            self.value_rows[:, ivar] = offset + np.searchsorted(exponents, column)
+            self.deriv_rows[:, ivar] = offset + np.searchsorted(exponents, deriv_column)
+
+            table_vars.extend([ivar] * len(exponents))
+            table_exponents.extend(exponents)
+
+        self.table_vars = table_vars
+        self.table_exponents = table_exponents
+        self.coeffs = coeffs
+        self.deriv_coeffs = coeffs[:, np.newaxis] * powers
+
+        chunk_size = self.options['chunk_size']
+        if chunk_size is None:
+            chunk_size = max(1, 2 ** 18 // (num_terms * (2 * num_vars + 2)))
+        self.chunk_size = min(chunk_size, self.var_size)
+
+        # Power tables, and flat work arrays for the stacked terms, keyed by dtype for
+        # complex step.
+        self.buffers = {}
+        self.tables = None
+
+    def _get_buffers(self, dtype):
+        if dtype not in self.buffers:
+            num_terms, num_vars = self.value_rows.shape
+            stack_size = num_terms * self.chunk_size
+            self.buffers[dtype] = (
+                np.empty((len(self.table_vars), self.var_size), dtype),
+                np.empty((2 * num_vars + 2, stack_size), dtype),
+            )
+
+        return self.buffers[dtype]
+
+    def _fill_tables(self, inputs):
         in_names = self.options['in_names']
+
+        dtype = np.result_type(*[inputs[in_name] for in_name in in_names])
+        tables, _ = self._get_buffers(dtype)
+
+        for row, (ivar, exponent) in enumerate(zip(self.table_vars, self.table_exponents)):
+            array = inputs[in_names[ivar]].reshape(-1)
+            if exponent == 0.:
+                tables[row] = 1.
+            elif exponent == 1.:
+                tables[row] = array
+            else:
+                np.power(array, exponent, out=tables[row])
+
+        self.tables = tables
+        self.array_cache_inputs(inputs)
+
+    def _iter_chunks(self):
+        num_terms = self.value_rows.shape[0]
+        _, stacks = self._get_buffers(self.tables.dtype)
+
+        for start in range(0, self.var_size, self.chunk_size):
+            columns = slice(start, min(start + self.chunk_size, self.var_size))
+            size = columns.stop - columns.start
+
+            # Contiguous (num_terms, size) views of the flat work arrays.
+            yield columns, [stack[:num_terms * size].reshape(num_terms, size) for stack in stacks]
+
+    def compute(self, inputs, outputs):
         out_name = self.options['out_name']
-        powers = self.options['powers']
         constant = self.options['constant']
-        coeffs = self.options['coeffs']
-        
-        outputs[out_name] = constant
-        for iterm in range(powers.shape[0]):
-            term = coeffs[iterm] * np.ones(outputs[out_name].shape)
-            for ivar, in_name in enumerate(in_names):
-                power = powers[iterm, ivar]
-                term *= inputs[in_name] ** power
 
-            outputs[out_name] += term
+        self._fill_tables(inputs)
+        tables = self.tables
+        num_vars = self.value_rows.shape[1]
 
-    def compute_partials(self, inputs, partials):
-        in_names = self.options['in_names']
-        out_name = self.options['out_name']
-        powers = self.options['powers']
-        coeffs = self.options['coeffs']
+        out = np.empty(self.var_size, tables.dtype)
+        if get_use_numba(self.options['use_numba'], tables):
+            linear_power_combination_kernel(
+                tables, self.value_rows, self.coeffs, numba_options['chunk_size'], out)
+            outputs[out_name] = constant + out.reshape(self.var_shape)
+            return
 
-        for in_name in in_names:
-            deriv = np.zeros(self.options['shape'])
+        for columns, stacks in self._iter_chunks():
+            terms, gathered = stacks[:2]
+            table_chunk = tables[:, columns]
+            np.take(table_chunk, self.value_rows[:, 0], axis=0, out=terms)
+            for ivar in range(1, num_vars):
+                np.take(table_chunk, self.value_rows[:, ivar], axis=0, out=gathered)
+                terms *= gathered
 
-            for iterm in range(powers.shape[0]):
-                term = coeffs[iterm]
-                for ivar, in_name2 in enumerate(in_names):
-                    power = powers[iterm, ivar]
+            out[columns] = self.coeffs.dot(terms)
 
-                    a = 1.
-                    b = power
-                    if in_name == in_name2:
-                        a = power
-                        b = power - 1.
+        outputs[out_name] = constant + out.reshape(self.var_shape)
 
-                    term *= a * inputs[in_name2] ** b
+    def compute_partials(self, inputs, partials):
+        in_names = self.options['in_names']
+        out_name = self.options['out_name']
 
-                deriv += term
+        if self.tables is None or not self.array_inputs_unchanged(inputs):
+            self._fill_tables(inputs)
+        tables = self.tables
+        num_vars = self.value_rows.shape[1]
 
-            partials[out_name, in_name] = deriv.flatten()
+        derivs = np.empty((num_vars, self.var_size), tables.dtype)
+        if get_use_numba(self.options['use_numba'], tables):
+            linear_power_combination_partials_kernel(
+                tables, self.value_rows, self.deriv_rows, self.deriv_coeffs,
+                numba_options['chunk_size'], derivs)
+            for ivar, in_name in enumerate(in_names):
+                partials[out_name, in_name] = derivs[ivar]
+            return
+
+        for columns, stacks in self._iter_chunks():
+            table_chunk = tables[:, columns]
+            values = stacks[:num_vars]
+            suffixes = stacks[num_vars:2 * num_vars]
+            prefix, deriv = stacks[2 * num_vars:]
+
+            for ivar in range(num_vars):
+                np.take(table_chunk, self.value_rows[:, ivar], axis=0, out=values[ivar])
+
+            suffixes[-1][:] = 1.
+            for ivar in reversed(range(num_vars - 1)):
+                np.multiply(suffixes[ivar + 1], values[ivar + 1], out=suffixes[ivar])
+
+            # The partial with respect to x_v is the sum over terms of coeff * p times the
+            # product of the factors before v, x_v ** (p - 1), and the factors after v.
+            prefix[:] = 1.
+            for ivar in range(num_vars):
+                np.take(table_chunk, self.deriv_rows[:, ivar], axis=0, out=deriv)
+                deriv *= prefix
+                deriv *= suffixes[ivar]
+                derivs[ivar, columns] = self.deriv_coeffs[:, ivar].dot(deriv)
+                prefix *= values[ivar]
+
+        for ivar, in_name in enumerate(in_names):
+            partials[out_name, in_name] = derivs[ivar]
 
 
 if __name__ == '__main__':
@@ -3,9 +3,23 @@ import numpy as np
 from lsdo_utils.comps.array_explicit_component import ArrayExplicitComponent
 from lsdo_utils.miscellaneous_functions.process_options import name_types, get_names_list
 from lsdo_utils.miscellaneous_functions.process_options import scalar_types, get_scalars_list
+from lsdo_utils.miscellaneous.numba_kernels import get_use_numba, power_combination_kernel, \
+    power_combination_partials_kernel
 
 
 class PowerCombinationComp(ArrayExplicitComponent):
+    """
+    Product of powers of the inputs, coeff * x_0 ** p_0 * x_1 ** p_1 * ...
+
+    compute stores each power and the prefix products of the factors; the partial with
+    respect to x_i is then the prefix product before i, times the suffix product after
+    i, times p_i * x_i ** (p_i - 1), so linearizing costs O(n) array operations and no
+    division, which keeps it exact when some inputs are zero.
+
+    With use_numba (or the global setting at setup, if None), both run as Numba kernels
+    instead, reading the inputs in place; the forward kernel stores the powers, which the
+    partials kernel reuses as long as the inputs are unchanged.
+    """
 
     def array_initialize(self):
         self.options.declare('out_name', types=str)
@@ -13,6 +27,7 @@ class PowerCombinationComp(ArrayExplicitComponent):
         self.options.declare('powers', default=1., types=scalar_types)
         self.options.declare('powers_dict', default=None, types=dict, allow_none=True)
         self.options.declare('coeff', default=1., types=(int, float, np.ndarray))
+        self.options.declare('use_numba', default=None, types=bool, allow_none=True)
 
         self.post_initialize()
 
@@ -46,37 +61,124 @@ class PowerCombinationComp(ArrayExplicitComponent):
             self.array_add_input(in_name)
             self.array_declare_partials(out_name, in_name)
 
-    def compute(self, inputs, outputs):
+        # Powered inputs, prefix products and work arrays, keyed by dtype for complex step.
+        self.buffers = {}
+
+        # Coefficients, powers and the output, powers and partials arrays of the kernels.
+        self.numba_buffers = None
+        if get_use_numba(self.options['use_numba']) and np.isrealobj(coeff):
+            num_inputs = len(in_names)
+            self.numba_buffers = (
+                np.broadcast_to(coeff, self.var_shape).reshape(-1).astype(float),
+                np.array(powers, float),
+                np.empty(self.var_size),
+                np.empty((num_inputs, self.var_size)),
+                np.empty((num_inputs, self.var_size)),
+            )
+
+    def _get_buffers(self, dtype):
+        if dtype not in self.buffers:
+            num_inputs = len(self.options['in_names'])
+            self.buffers[dtype] = (
+                np.empty((num_inputs, self.var_size), dtype),
+                np.empty((num_inputs + 1, self.var_size), dtype),
+                np.empty(self.var_size, dtype),
+                np.empty(self.var_size, dtype),
+            )
+
+        return self.buffers[dtype]
+
+    def _get_numba_arrays(self, inputs):
+        arrays = tuple(
+            np.ascontiguousarray(inputs[in_name]).reshape(-1)
+            for in_name in self.options['in_names']
+        )
+        if self.numba_buffers is None or not get_use_numba(self.options['use_numba'], *arrays):
+            return None
+
+        return arrays
+
+    def _evaluate_numba(self, inputs, arrays):
+        coeff_vector, powers_vector, out, powered, derivs = self.numba_buffers
+
+        power_combination_kernel(arrays, powers_vector, coeff_vector, out, powered)
+        self.array_cache_inputs(inputs, 'numba')
+
+        return out
+
+    def _evaluate(self, inputs):
         in_names = self.options['in_names']
-        out_name = self.options['out_name']
         powers = self.options['powers']
         coeff = self.options['coeff']
-        
-        outputs[out_name] = coeff
-        for in_name, power in zip(in_names, powers):
-            outputs[out_name] *= inputs[in_name] ** power
+
+        dtype = np.result_type(coeff, *[inputs[in_name] for in_name in in_names])
+        powered, prefix, _, _ = self._get_buffers(dtype)
+
+        prefix[0] = np.broadcast_to(coeff, self.var_shape).reshape(-1)
+        for index, (in_name, power) in enumerate(zip(in_names, powers)):
+            array = inputs[in_name].reshape(-1)
+            if power == 1.:
+                powered[index] = array
+            else:
+                np.power(array, power, out=powered[index])
+
+            np.multiply(prefix[index], powered[index], out=prefix[index + 1])
+
+        self.powered = powered
+        self.prefix = prefix
+        self.array_cache_inputs(inputs)
+
+        return prefix[-1]
+
+    def compute(self, inputs, outputs):
+        out_name = self.options['out_name']
+
+        arrays = self._get_numba_arrays(inputs)
+        if arrays is not None:
+            outputs[out_name] = self._evaluate_numba(inputs, arrays).reshape(self.var_shape)
+            return
+
+        outputs[out_name] = self._evaluate(inputs).reshape(self.var_shape)
 
     def compute_partials(self, inputs, partials):
         in_names = self.options['in_names']
         out_name = self.options['out_name']
         powers = self.options['powers']
-        coeff = self.options['coeff']
-        
-        value = coeff
-        for in_name, power in zip(in_names, powers):
-            value *= inputs[in_name] ** power
 
-        for in_name in in_names:
-            deriv = coeff * np.ones(self.options['shape'])
-            for in_name2, power in zip(in_names, powers):
-                a = 1.
-                b = power
-                if in_name == in_name2:
-                    a = power
-                    b = power - 1.
-                deriv *= a * inputs[in_name2] ** b
-
-            partials[out_name, in_name] = deriv.flatten()
+        arrays = self._get_numba_arrays(inputs)
+        if arrays is not None:
+            if not self.array_inputs_unchanged(inputs, 'numba'):
+                self._evaluate_numba(inputs, arrays)
+
+            coeff_vector, powers_vector, out, powered, derivs = self.numba_buffers
+            power_combination_partials_kernel(
+                arrays, powers_vector, coeff_vector, powered, derivs)
+            for index, in_name in enumerate(in_names):
+                partials[out_name, in_name] = derivs[index]
+            return
+
+        if not self.array_inputs_unchanged(inputs):
+            self._evaluate(inputs)
+
+        powered, prefix, suffix, deriv = self._get_buffers(self.prefix.dtype)
+
+        suffix[:] = 1.
+        for index in reversed(range(len(in_names))):
+            in_name = in_names[index]
+            power = powers[index]
+
+            if power == 0.:
+                deriv[:] = 0.
+            elif power == 1.:
+                np.multiply(prefix[index], suffix, out=deriv)
+            else:
+                np.power(inputs[in_name].reshape(-1), power - 1., out=deriv)
+                deriv *= power
+                deriv *= prefix[index]
+                deriv *= suffix
+
+            partials[out_name, in_name] = deriv
+            suffix *= powered[index]
 
 
 if __name__ == '__main__':
@@ -2,7 +2,7 @@ import numpy as np
 
 from openmdao.api import ExplicitComponent
 
-from lsdo_utils.miscellaneous_functions.get_array_indices import get_array_indices
+from lsdo_utils.miscellaneous.structured_jacobians import ReductionJacobian
 from lsdo_utils.miscellaneous_functions.decompose_shape_tuple import decompose_shape_tuple
 
 
@@ -13,6 +13,7 @@ class ArrayContractionComp(ExplicitComponent):
         self.options.declare('contract_indices', types=list)
         self.options.declare('in_name', types=str)
         self.options.declare('out_name', types=str)
+        self.options.declare('matrix_free', default=False, types=bool)
 
     def setup(self):
         shape = self.options['shape']
@@ -25,17 +26,17 @@ class ArrayContractionComp(ExplicitComponent):
             out_shape, ones_shape, in_shape,
         ) = decompose_shape_tuple(shape, contract_indices)
 
-        einsum_string = '{},{}->{}'.format(out_string, ones_string, in_string)
-
         self.add_input(in_name, shape=in_shape)
         self.add_output(out_name, shape=out_shape)
 
-        in_indices = get_array_indices(*in_shape)
-        out_indices = get_array_indices(*out_shape)
+        self.jacobian = ReductionJacobian(shape, contract_indices)
+
+        self.matrix_free = self.options['matrix_free']
+        if self.matrix_free:
+            return
 
-        rows = np.einsum(einsum_string, out_indices, np.ones(ones_shape, int)).flatten()
-        cols = in_indices.flatten()
-        self.declare_partials(out_name, in_name, val=1., rows=rows, cols=cols)
+        self.declare_partials(
+            out_name, in_name, val=1., rows=self.jacobian.rows, cols=self.jacobian.cols)
 
     def compute(self, inputs, outputs):
         in_name = self.options['in_name']
@@ -44,6 +45,18 @@ class ArrayContractionComp(ExplicitComponent):
 
         outputs[out_name] = np.sum(inputs[in_name], axis=tuple(contract_indices))
 
+    def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
+        in_name = self.options['in_name']
+        out_name = self.options['out_name']
+
+        if out_name not in d_outputs or in_name not in d_inputs:
+            return
+
+        if mode == 'fwd':
+            d_outputs[out_name] += self.jacobian.apply_fwd(d_inputs[in_name])
+        else:
+            d_inputs[in_name] += self.jacobian.apply_rev(d_outputs[out_name])
+
 
 if __name__ == '__main__':
     from openmdao.api import Problem, IndepVarComp
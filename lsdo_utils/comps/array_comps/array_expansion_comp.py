@@ -2,8 +2,8 @@ import numpy as np
 
 from openmdao.api import ExplicitComponent
 
-from lsdo_utils.miscellaneous_functions.get_array_indices import get_array_indices
 from lsdo_utils.miscellaneous_functions.decompose_shape_tuple import decompose_shape_tuple
+from lsdo_utils.miscellaneous.structured_jacobians import BroadcastJacobian
 
 
 class ArrayExpansionComp(ExplicitComponent):
@@ -13,6 +13,7 @@ class ArrayExpansionComp(ExplicitComponent):
         self.options.declare('expand_indices', types=list)
         self.options.declare('in_name', types=str)
         self.options.declare('out_name', types=str)
+        self.options.declare('matrix_free', default=False, types=bool)
 
     def setup(self):
         shape = self.options['shape']
@@ -25,26 +26,40 @@ class ArrayExpansionComp(ExplicitComponent):
             in_shape, ones_shape, out_shape,
         ) = decompose_shape_tuple(shape, expand_indices)
 
-        einsum_string = '{},{}->{}'.format(in_string, ones_string, out_string)
-
         self.add_input(in_name, shape=in_shape)
         self.add_output(out_name, shape=out_shape)
 
-        in_indices = get_array_indices(*in_shape)
-        out_indices = get_array_indices(*out_shape)
+        # The input viewed with unit-length expanded axes broadcasts directly to the output.
+        self.jacobian = BroadcastJacobian(shape, expand_indices)
+        self.broadcast_shape = self.jacobian.broadcast_shape
 
-        self.einsum_string = einsum_string
-        self.ones_shape = ones_shape
+        self.matrix_free = self.options['matrix_free']
+        if self.matrix_free:
+            return
 
-        rows = out_indices.flatten()
-        cols = np.einsum(einsum_string, in_indices, np.ones(ones_shape, int)).flatten()
-        self.declare_partials(out_name, in_name, val=1., rows=rows, cols=cols)
+        self.declare_partials(
+            out_name, in_name, val=1., rows=self.jacobian.rows, cols=self.jacobian.cols)
 
     def compute(self, inputs, outputs):
         in_name = self.options['in_name']
         out_name = self.options['out_name']
 
-        outputs[out_name] = np.einsum(self.einsum_string, inputs[in_name], np.ones(self.ones_shape))
+        outputs[out_name] = np.broadcast_to(
+            np.reshape(inputs[in_name], self.broadcast_shape),
+            self.options['shape'],
+        )
+
+    def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
+        in_name = self.options['in_name']
+        out_name = self.options['out_name']
+
+        if out_name not in d_outputs or in_name not in d_inputs:
+            return
+
+        if mode == 'fwd':
+            d_outputs[out_name] += self.jacobian.apply_fwd(d_inputs[in_name])
+        else:
+            d_inputs[in_name] += self.jacobian.apply_rev(d_outputs[out_name])
 
 
 if __name__ == '__main__':
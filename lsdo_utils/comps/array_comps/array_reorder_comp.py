@@ -1,9 +1,157 @@
+import string
+
 import numpy as np
 
 from openmdao.api import ExplicitComponent
 
+from lsdo_utils.miscellaneous.structured_jacobians import PermutationJacobian
+
+
+def parse_subscripts(subscripts):
+    """
+    Split a subscripts string into groups, one per array axis.
+
+    Letters inside parentheses form a single axis that merges those elementary axes, in
+    row-major order; e.g., '(ij)k' describes a rank-2 array whose first axis merges i and j.
+    """
+    groups = []
+    group = None
+    for char in subscripts.replace(' ', ''):
+        if char == '(':
+            if group is not None:
+                raise ValueError('Nested parentheses in subscripts {}'.format(subscripts))
+            group = ''
+        elif char == ')':
+            if not group:
+                raise ValueError('Unmatched or empty parentheses in subscripts {}'.format(
+                    subscripts))
+            groups.append(group)
+            group = None
+        elif char.isalpha():
+            if group is None:
+                groups.append(char)
+            else:
+                group += char
+        else:
+            raise ValueError('Invalid character {} in subscripts {}'.format(char, subscripts))
+
+    if group is not None:
+        raise ValueError('Unmatched parentheses in subscripts {}'.format(subscripts))
+
+    return groups
+
+
+def _is_in_parentheses(subscripts, index):
+    return subscripts[:index].count('(') > subscripts[:index].count(')')
+
+
+def expand_ellipsis(in_subscripts, out_subscripts, in_shape, out_shape):
+    """
+    Replace '...' in both subscripts with unused letters, one per axis it stands for, as in
+    np.einsum; e.g., '...jk' -> 'kj...' with rank-4 arrays becomes 'ABjk' -> 'kjAB'.
+
+    The number of axes is taken from a side where the ellipsis is not inside parentheses.
+    """
+    in_index = in_subscripts.find('...')
+    out_index = out_subscripts.find('...')
+
+    if in_index < 0 and out_index < 0:
+        return in_subscripts, out_subscripts
+    if in_index < 0 or out_index < 0:
+        raise ValueError('Subscripts {} and {} must both contain an ellipsis or neither'.format(
+            in_subscripts, out_subscripts))
+    if in_subscripts.count('...') > 1 or out_subscripts.count('...') > 1:
+        raise ValueError('Subscripts {} and {} contain more than one ellipsis'.format(
+            in_subscripts, out_subscripts))
+
+    num_axes = None
+    for subscripts, shape, index in [
+        (in_subscripts, in_shape, in_index),
+        (out_subscripts, out_shape, out_index),
+    ]:
+        if not _is_in_parentheses(subscripts, index):
+            num_axes = len(shape) - len(parse_subscripts(subscripts.replace('...', '')))
+            break
+
+    if num_axes is None:
+        raise ValueError('The ellipsis of {} -> {} cannot be inside parentheses on both sides'
+            .format(in_subscripts, out_subscripts))
+
+    unused = [
+        letter for letter in string.ascii_letters
+        if letter not in in_subscripts and letter not in out_subscripts
+    ]
+    if num_axes < 0 or num_axes > len(unused):
+        raise ValueError('Subscripts {} do not match shape {}'.format(in_subscripts, in_shape))
+
+    letters = ''.join(unused[:num_axes])
+    return in_subscripts.replace('...', letters), out_subscripts.replace('...', letters)
+
+
+def get_reorder_plan(in_subscripts, out_subscripts, in_shape, out_shape):
+    """
+    Compile a reorder into (in_elem_shape, out_elem_shape, perm) such that
+    x.reshape(in_elem_shape).transpose(perm) is the output viewed as out_elem_shape.
+    """
+    in_subscripts, out_subscripts = expand_ellipsis(
+        in_subscripts, out_subscripts, in_shape, out_shape)
+
+    in_groups = parse_subscripts(in_subscripts)
+    out_groups = parse_subscripts(out_subscripts)
+
+    in_letters = ''.join(in_groups)
+    out_letters = ''.join(out_groups)
+
+    if len(set(in_letters)) != len(in_letters) or sorted(in_letters) != sorted(out_letters):
+        raise ValueError(
+            'Subscripts {} and {} must contain the same letters, each exactly once'.format(
+                in_subscripts, out_subscripts))
+
+    for groups, shape, subscripts in [
+        (in_groups, in_shape, in_subscripts),
+        (out_groups, out_shape, out_subscripts),
+    ]:
+        if len(groups) != len(shape):
+            raise ValueError('Subscripts {} do not match shape {}'.format(subscripts, shape))
+
+    # Resolve the size of each elementary axis from the groups on both sides.
+    sizes = {}
+    constraints = list(zip(in_groups, in_shape)) + list(zip(out_groups, out_shape))
+    while True:
+        progress = False
+        for group, size in constraints:
+            unknown = [letter for letter in group if letter not in sizes]
+            if len(unknown) == 1:
+                known = int(np.prod([sizes[letter] for letter in group if letter in sizes]))
+                sizes[unknown[0]] = size // known
+                progress = True
+        if not progress:
+            break
+
+    if len(sizes) != len(in_letters):
+        raise ValueError('Cannot infer the axis sizes of {} -> {} from shapes {} and {}'.format(
+            in_subscripts, out_subscripts, in_shape, out_shape))
+
+    for group, size in constraints:
+        if int(np.prod([sizes[letter] for letter in group])) != size:
+            raise ValueError('Shapes {} and {} are inconsistent with {} -> {}'.format(
+                in_shape, out_shape, in_subscripts, out_subscripts))
+
+    in_elem_shape = tuple(sizes[letter] for letter in in_letters)
+    out_elem_shape = tuple(sizes[letter] for letter in out_letters)
+    perm = tuple(in_letters.index(letter) for letter in out_letters)
+
+    return in_elem_shape, out_elem_shape, perm
+
 
 class ArrayReorderComp(ExplicitComponent):
+    """
+    Transpose, merge and split the axes of an array.
+
+    The subscripts are compiled once at setup into a reshape, an axis permutation and a
+    second reshape; parentheses group letters into merged axes, e.g., 'ijk' -> 'k(ij)', and
+    an ellipsis stands for the remaining axes, as in np.einsum, e.g., '...jk' -> '...kj'.
+    """
 
     def initialize(self):
         self.options.declare('in_shape', types=tuple)
@@ -12,6 +160,7 @@ class ArrayReorderComp(ExplicitComponent):
         self.options.declare('out_subscripts', types=str)
         self.options.declare('in_name', types=str)
         self.options.declare('out_name', types=str)
+        self.options.declare('matrix_free', default=False, types=bool)
 
     def setup(self):
         in_shape = self.options['in_shape']
@@ -24,18 +173,83 @@ class ArrayReorderComp(ExplicitComponent):
         self.add_input(in_name, shape=in_shape)
         self.add_output(out_name, shape=out_shape)
 
-        size = np.prod(in_shape)
-        rows = np.arange(size)
-        cols = np.einsum(
-            in_subscripts + '->' + out_subscripts, 
-            np.arange(size).reshape(in_shape),
-        ).flatten()
-        self.declare_partials(out_name, in_name, val=1., rows=rows, cols=cols)
+        self.in_elem_shape, self.out_elem_shape, self.perm = get_reorder_plan(
+            in_subscripts, out_subscripts, in_shape, out_shape)
+        self.jacobian = PermutationJacobian(self.in_elem_shape, self.perm, in_shape, out_shape)
+
+        self.matrix_free = self.options['matrix_free']
+        if self.matrix_free:
+            return
+
+        self.declare_partials(
+            out_name, in_name, val=1., rows=self.jacobian.rows, cols=self.jacobian.cols)
 
     def compute(self, inputs, outputs):
-        in_subscripts = self.options['in_subscripts']
-        out_subscripts = self.options['out_subscripts']
         in_name = self.options['in_name']
         out_name = self.options['out_name']
-        
-        outputs[out_name] = np.einsum(in_subscripts + '->' + out_subscripts, inputs[in_name])
\ No newline at end of file
+
+        # The permutation is written straight into the output vector.
+        np.copyto(
+            outputs[out_name].reshape(self.out_elem_shape),
+            inputs[in_name].reshape(self.in_elem_shape).transpose(self.perm),
+        )
+
+    def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
+        in_name = self.options['in_name']
+        out_name = self.options['out_name']
+
+        if out_name not in d_outputs or in_name not in d_inputs:
+            return
+
+        if mode == 'fwd':
+            d_outputs[out_name] += self.jacobian.apply_fwd(d_inputs[in_name])
+        else:
+            d_inputs[in_name] += self.jacobian.apply_rev(d_outputs[out_name])
+
+
+if __name__ == '__main__':
+    from openmdao.api import Problem, IndepVarComp
+
+    prob = Problem()
+
+    comp = IndepVarComp()
+    comp.add_output('x', np.random.rand(2, 3, 4))
+    prob.model.add_subsystem('ivc', comp, promotes=['*'])
+
+    comp = ArrayReorderComp(
+        in_shape=(2, 3, 4),
+        out_shape=(4, 6),
+        in_subscripts='ijk',
+        out_subscripts='k(ij)',
+        in_name='x',
+        out_name='y',
+    )
+    prob.model.add_subsystem('merge_comp', comp, promotes=['*'])
+
+    comp = ArrayReorderComp(
+        in_shape=(4, 6),
+        out_shape=(3, 4, 2),
+        in_subscripts='k(ij)',
+        out_subscripts='jki',
+        in_name='y',
+        out_name='z',
+        matrix_free=True,
+    )
+    prob.model.add_subsystem('split_comp', comp, promotes=['*'])
+
+    comp = ArrayReorderComp(
+        in_shape=(2, 3, 4),
+        out_shape=(2, 4, 3),
+        in_subscripts='...jk',
+        out_subscripts='...kj',
+        in_name='x',
+        out_name='w',
+    )
+    prob.model.add_subsystem('ellipsis_comp', comp, promotes=['*'])
+
+    prob.setup(check=True)
+    prob.run_model()
+    prob.check_partials(compact_print=True)
+
+    print(np.abs(prob['z'] - np.einsum('ijk->jki', prob['x'])).max())
+    print(np.abs(prob['w'] - np.einsum('...jk->...kj', prob['x'])).max())
@@ -0,0 +1,179 @@
+import numpy as np
+
+from openmdao.api import ExplicitComponent
+
+from lsdo_utils.miscellaneous_functions.get_grid_indices import get_grid_indices
+
+
+def parse_einsum_operation(operation, in_shapes):
+    """
+    Split an explicit einsum operation into per-operand subscripts and get the letter sizes.
+
+    Returns (in_subscripts, out_subscripts, sizes), with sizes a dict from letter to size.
+    """
+    operation = operation.replace(' ', '')
+
+    if operation.count('->') != 1:
+        raise ValueError('Operation {} must contain exactly one \'->\''.format(operation))
+
+    in_string, out_subscripts = operation.split('->')
+    in_subscripts = in_string.split(',')
+
+    if len(in_subscripts) != len(in_shapes):
+        raise ValueError('Operation {} has {} operands, but {} shapes were given'.format(
+            operation, len(in_subscripts), len(in_shapes)))
+
+    sizes = {}
+    for subscripts, shape in zip(in_subscripts, in_shapes):
+        if not subscripts.isalpha() and subscripts != '':
+            raise ValueError('Invalid subscripts {} in {}'.format(subscripts, operation))
+        if len(set(subscripts)) != len(subscripts):
+            raise ValueError('Repeated subscripts {} are not supported'.format(subscripts))
+        if len(subscripts) != len(shape):
+            raise ValueError('Subscripts {} do not match shape {}'.format(subscripts, shape))
+
+        for letter, size in zip(subscripts, shape):
+            if sizes.setdefault(letter, size) != size:
+                raise ValueError('Inconsistent sizes for subscript {} in {}'.format(
+                    letter, operation))
+
+    if len(set(out_subscripts)) != len(out_subscripts):
+        raise ValueError('Repeated output subscripts {}'.format(out_subscripts))
+    for letter in out_subscripts:
+        if letter not in sizes:
+            raise ValueError('Output subscript {} does not appear in any operand'.format(letter))
+
+    return in_subscripts, out_subscripts, sizes
+
+
+def get_einsum_partials_indices(in_subscripts, out_subscripts, sizes):
+    """
+    Get the rows and cols of the exact sparsity of the output with respect to one operand.
+
+    The nonzeros are enumerated over the union of the output and operand subscripts, in the
+    order returned as the first value, so that the partial values are a flattened array
+    with those subscripts.
+    """
+    union = out_subscripts + ''.join(
+        letter for letter in in_subscripts if letter not in out_subscripts)
+    union_shape = tuple(sizes[letter] for letter in union)
+    rows = get_grid_indices(union_shape, [union.index(letter) for letter in out_subscripts])
+    cols = get_grid_indices(union_shape, [union.index(letter) for letter in in_subscripts])
+
+    return union, rows, cols
+
+
+class EinsumComp(ExplicitComponent):
+    """
+    General tensor contraction, out = einsum(operation, *inputs), for any number of operands.
+
+    The Jacobian sparsity with respect to each operand is derived from the subscripts: it
+    has one nonzero per combination of the output and operand subscripts, and its values
+    are the einsum of the remaining operands. The contraction paths for compute and for
+    every partial are optimized once at setup and reused.
+    """
+
+    def initialize(self):
+        self.options.declare('operation', types=str)
+        self.options.declare('in_names', types=list)
+        self.options.declare('in_shapes', types=list)
+        self.options.declare('out_name', types=str)
+        self.options.declare('optimize', default='greedy', values=['greedy', 'optimal'])
+
+    def setup(self):
+        operation = self.options['operation']
+        in_names = self.options['in_names']
+        in_shapes = [tuple(shape) for shape in self.options['in_shapes']]
+        out_name = self.options['out_name']
+        optimize = self.options['optimize']
+
+        if len(in_names) != len(in_shapes):
+            raise ValueError('in_names and in_shapes must have the same length')
+
+        in_subscripts, out_subscripts, sizes = parse_einsum_operation(operation, in_shapes)
+        out_shape = tuple(sizes[letter] for letter in out_subscripts)
+
+        self.operation = '{}->{}'.format(','.join(in_subscripts), out_subscripts)
+        self.out_shape = out_shape
+
+        for in_name, in_shape in zip(in_names, in_shapes):
+            self.add_input(in_name, shape=in_shape)
+        self.add_output(out_name, shape=out_shape)
+
+        operands = [np.empty(shape) for shape in in_shapes]
+        self.path = np.einsum_path(self.operation, *operands, optimize=optimize)[0]
+
+        # For each operand, the operation giving its partials from the other operands and
+        # the shape it is broadcast to; with a single operand, the partials are constant.
+        self.partials_data = {}
+        for index, in_name in enumerate(in_names):
+            union, rows, cols = get_einsum_partials_indices(
+                in_subscripts[index], out_subscripts, sizes)
+
+            others = [other for other in range(len(in_names)) if other != index]
+            if not others:
+                self.declare_partials(out_name, in_name, val=1., rows=rows, cols=cols)
+                continue
+
+            other_letters = set(''.join(in_subscripts[other] for other in others))
+            partial_subscripts = ''.join(letter for letter in union if letter in other_letters)
+            partial_operation = '{}->{}'.format(
+                ','.join(in_subscripts[other] for other in others), partial_subscripts)
+            partial_path = np.einsum_path(
+                partial_operation, *[operands[other] for other in others], optimize=optimize,
+            )[0]
+
+            partial_shape = tuple(
+                sizes[letter] if letter in other_letters else 1 for letter in union)
+            union_shape = tuple(sizes[letter] for letter in union)
+
+            self.partials_data[in_name] = (
+                others, partial_operation, partial_path, partial_shape, union_shape)
+            self.declare_partials(out_name, in_name, rows=rows, cols=cols)
+
+    def compute(self, inputs, outputs):
+        in_names = self.options['in_names']
+        out_name = self.options['out_name']
+
+        outputs[out_name] = np.einsum(
+            self.operation, *[inputs[in_name] for in_name in in_names], optimize=self.path)
+
+    def compute_partials(self, inputs, partials):
+        in_names = self.options['in_names']
+        out_name = self.options['out_name']
+
+        for in_name, data in self.partials_data.items():
+            others, partial_operation, partial_path, partial_shape, union_shape = data
+
+            value = np.einsum(
+                partial_operation, *[inputs[in_names[other]] for other in others],
+                optimize=partial_path,
+            )
+            partials[out_name, in_name] = np.broadcast_to(
+                np.reshape(value, partial_shape), union_shape).flatten()
+
+
+if __name__ == '__main__':
+    from openmdao.api import Problem, IndepVarComp
+
+    prob = Problem()
+
+    comp = IndepVarComp()
+    comp.add_output('a', np.random.rand(5, 3, 4))
+    comp.add_output('b', np.random.rand(5, 4, 2))
+    comp.add_output('c', np.random.rand(2))
+    prob.model.add_subsystem('ivc', comp, promotes=['*'])
+
+    comp = EinsumComp(
+        operation='nij,njk,k->ni',
+        in_names=['a', 'b', 'c'],
+        in_shapes=[(5, 3, 4), (5, 4, 2), (2,)],
+        out_name='d',
+    )
+    prob.model.add_subsystem('einsum_comp', comp, promotes=['*'])
+
+    prob.setup(check=True)
+    prob.run_model()
+    prob.check_partials(compact_print=True)
+
+    print(prob['d'])
@@ -2,7 +2,7 @@ import numpy as np
 
 from openmdao.api import ExplicitComponent
 
-from lsdo_utils.miscellaneous_functions.get_array_indices import get_array_indices
+from lsdo_utils.miscellaneous.structured_jacobians import ReductionJacobian
 
 
 class ScalarContractionComp(ExplicitComponent):
@@ -11,6 +11,7 @@ class ScalarContractionComp(ExplicitComponent):
         self.options.declare('shape', types=tuple)
         self.options.declare('in_name', types=str)
         self.options.declare('out_name', types=str)
+        self.options.declare('matrix_free', default=False, types=bool)
 
     def setup(self):
         shape = self.options['shape']
@@ -20,9 +21,14 @@ class ScalarContractionComp(ExplicitComponent):
         self.add_input(in_name, shape=shape)
         self.add_output(out_name)
 
-        rows = np.zeros(np.prod(shape), int)
-        cols = np.arange(np.prod(shape))
-        self.declare_partials(out_name, in_name, val=1., rows=rows, cols=cols)
+        self.jacobian = ReductionJacobian(shape, range(len(shape)))
+
+        self.matrix_free = self.options['matrix_free']
+        if self.matrix_free:
+            return
+
+        self.declare_partials(
+            out_name, in_name, val=1., rows=self.jacobian.rows, cols=self.jacobian.cols)
 
     def compute(self, inputs, outputs):
         in_name = self.options['in_name']
@@ -30,6 +36,18 @@ class ScalarContractionComp(ExplicitComponent):
 
         outputs[out_name] = np.sum(inputs[in_name])
 
+    def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
+        in_name = self.options['in_name']
+        out_name = self.options['out_name']
+
+        if out_name not in d_outputs or in_name not in d_inputs:
+            return
+
+        if mode == 'fwd':
+            d_outputs[out_name] += self.jacobian.apply_fwd(d_inputs[in_name])
+        else:
+            d_inputs[in_name] += self.jacobian.apply_rev(d_outputs[out_name])
+
 
 if __name__ == '__main__':
     from openmdao.api import Problem, IndepVarComp
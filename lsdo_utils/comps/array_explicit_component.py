@@ -1,35 +1,130 @@
+import fnmatch
+
 import numpy as np
 
 from openmdao.api import ExplicitComponent
 
+from lsdo_utils.miscellaneous.structured_jacobians import DiagonalJacobian
+
+
+class _ArrayPartials(dict):
+    # Partials values written by compute_partials in matrix-free mode; like the partials of
+    # OpenMDAO, values are copied, so they can be views into reused buffers.
+
+    def __setitem__(self, key, val):
+        super(_ArrayPartials, self).__setitem__(key, np.array(val))
+
 
 class ArrayExplicitComponent(ExplicitComponent):
+    """
+    Base class for elementwise components whose inputs and outputs all have the same shape.
+
+    Every partial declared with array_declare_partials is diagonal. Unless matrix_free is
+    set, it is declared with rows and cols shared between all components of the same
+    shape; in matrix_free mode, no index arrays are built at all and the Jacobian-vector
+    products apply the values written by compute_partials, which is only re-run when the
+    inputs have changed.
+
+    array_record_setup runs array_setup without adding anything to OpenMDAO, only recording
+    the variables and partials, so that the component can be evaluated inside another one,
+    e.g., FusedArrayComp.
+    """
 
     def initialize(self):
         self.options.declare('shape', types=tuple)
+        self.options.declare('matrix_free', default=False, types=bool)
 
         self.array_initialize()
 
     def array_add_input(self, name, *args, **kwargs):
-        self.add_input(name, *args, **kwargs, shape=self.var_shape)
+        if not self.array_recording:
+            self.add_input(name, *args, **kwargs, shape=self.var_shape)
+        self.array_in_names.append(name)
+        self.array_var_args[name] = args, kwargs
 
     def array_add_output(self, name, *args, **kwargs):
-        self.add_output(name, *args, **kwargs, shape=self.var_shape)
+        if not self.array_recording:
+            self.add_output(name, *args, **kwargs, shape=self.var_shape)
+        self.array_out_names.append(name)
+        self.array_var_args[name] = args, kwargs
 
     def array_declare_partials(self, out_name, in_name, val=1.):
-        arange = np.arange(self.var_size)
-        self.declare_partials(out_name, in_name, val=val, rows=arange, cols=arange)
+        jacobian = self.array_jacobian
 
-    def setup(self):
+        for out_name_ in fnmatch.filter(self.array_out_names, out_name):
+            for in_name_ in fnmatch.filter(self.array_in_names, in_name):
+                self.array_partials[out_name_, in_name_] = val
+
+        if not self.matrix_free and not self.array_recording:
+            self.declare_partials(
+                out_name, in_name, val=val, rows=jacobian.rows, cols=jacobian.cols)
+
+    def array_cache_inputs(self, inputs, key='compute'):
+        cached_inputs = self.array_cached_inputs.setdefault(key, {})
+
+        # Copy into the arrays of the previous call when possible, to avoid reallocating.
+        for in_name in self.array_in_names:
+            cached_input = cached_inputs.get(in_name)
+            if cached_input is None or cached_input.dtype != inputs[in_name].dtype:
+                cached_inputs[in_name] = np.array(inputs[in_name])
+            else:
+                np.copyto(cached_input, inputs[in_name])
+
+    def array_inputs_unchanged(self, inputs, key='compute'):
+        cached_inputs = self.array_cached_inputs.get(key)
+        if not cached_inputs:
+            return False
+
+        for in_name in self.array_in_names:
+            cached_input = cached_inputs[in_name]
+            if cached_input.dtype != inputs[in_name].dtype:
+                return False
+            if not np.array_equal(inputs[in_name], cached_input):
+                return False
+
+        return True
+
+    def _array_setup_attributes(self, recording):
         self.var_shape = self.options['shape']
         self.var_size = np.prod(self.options['shape'])
 
+        self.matrix_free = self.options['matrix_free']
+        self.array_recording = recording
+        self.array_jacobian = DiagonalJacobian(self.var_shape)
+        self.array_in_names = []
+        self.array_out_names = []
+        self.array_var_args = {}
+        self.array_partials = _ArrayPartials()
+        self.array_cached_inputs = {}
+
+    def setup(self):
+        self._array_setup_attributes(recording=False)
+
         self.array_setup()
 
         self.set_check_partial_options('*', method='cs')
 
+    def array_record_setup(self):
+        self._array_setup_attributes(recording=True)
+
+        self.array_setup()
+
+    def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
+        if not self.array_inputs_unchanged(inputs, 'jacvec'):
+            self.compute_partials(inputs, self.array_partials)
+            self.array_cache_inputs(inputs, 'jacvec')
+
+        for (out_name, in_name), val in self.array_partials.items():
+            if out_name not in d_outputs or in_name not in d_inputs:
+                continue
+
+            if mode == 'fwd':
+                d_outputs[out_name] += self.array_jacobian.apply_fwd(d_inputs[in_name], val)
+            else:
+                d_inputs[in_name] += self.array_jacobian.apply_rev(d_outputs[out_name], val)
+
     def array_initialize(self):
         pass
 
     def array_setup(self):
-        pass
\ No newline at end of file
+        pass
@@ -6,6 +6,26 @@ from lsdo_utils.miscellaneous.simple_types import function_type
 
 
 class BracketedImplicitComp(ImplicitComponent):
+    """
+    Elementwise root of a scalar residual in out_name, found by bracketing in
+    solve_nonlinear.
+
+    get_res_func(options, inputs, x) returns the residual at x, with the shape of x.
+    get_derivs_func(options, inputs, x, partials) sets partials[out_name, in_name] for every
+    input and returns the derivative of the residual with respect to x, which linearize
+    keeps for solve_linear. The Newton method also calls it at every iteration, with a
+    scratch dict as partials: there, only the return value is used, and what the function
+    assigns into partials is discarded.
+
+    With elementwise (the default), the residual of each element must only depend on the
+    same element of x and of the inputs, since get_res_func may receive flat subsets of
+    the elements: the ones not converged yet in the iterations, along with get_derivs_func
+    for Newton, and the ones whose bracket is moved by bracket expansion or by the fallback
+    of warm-started brackets, even with both tolerances at 0. A residual that is not
+    elementwise, e.g., that builds arrays from options['shape'], requires
+    elementwise=False, with which every call receives the inputs and x in the full shape,
+    all the elements being evaluated.
+    """
 
     def initialize(self):
         self.options.declare('shape', types=tuple)
@@ -14,6 +34,28 @@ class BracketedImplicitComp(ImplicitComponent):
         self.options.declare('get_res_func', types=function_type)
         self.options.declare('get_derivs_func', types=function_type)
         self.options.declare('max_iter', default=50, types=int)
+        self.options.declare('elementwise', default=True, types=bool,
+            desc='Whether the residual is elementwise, so that only the elements that are '
+                 'not converged are passed to get_res_func, as flat arrays.')
+        self.options.declare('bracket_tol', default=0., types=(int, float),
+            desc='Absolute tolerance on the bracket width of each element.')
+        self.options.declare('res_tol', default=0., types=(int, float),
+            desc='Absolute tolerance on the residual of each element.')
+        self.options.declare('method', default='bisection',
+            values=['bisection', 'illinois', 'newton'],
+            desc='Bisection, regula falsi with the Illinois modification, or Newton '
+                 'safeguarded by the bracket using get_derivs_func.')
+        self.options.declare('lower', default=0., types=(int, float, np.ndarray, function_type),
+            desc='Lower end of the initial bracket, or a function of (options, inputs).')
+        self.options.declare('upper', default=1., types=(int, float, np.ndarray, function_type),
+            desc='Upper end of the initial bracket, or a function of (options, inputs).')
+        self.options.declare('max_expand', default=0, types=int,
+            desc='Maximum number of outward expansions of brackets that do not straddle '
+                 'a sign change of the residual.')
+        self.options.declare('warm_start', default=False, types=bool,
+            desc='Start from a bracket of half-width warm_start_width around the '
+                 'previous solution.')
+        self.options.declare('warm_start_width', default=1e-2, types=float)
 
         self.post_initialize()
 
@@ -38,6 +80,12 @@ class BracketedImplicitComp(ImplicitComponent):
 
         self.declare_partials('*', '*', rows=arange, cols=arange)
 
+        self.x_prev = None
+
+        # Partials passed to get_derivs_func by the Newton iterations, whose values are
+        # not used.
+        self.newton_partials = {}
+
     def apply_nonlinear(self, inputs, outputs, residuals):
         out_name = self.options['out_name']
         get_res_func = self.options['get_res_func']
@@ -45,21 +93,222 @@ class BracketedImplicitComp(ImplicitComponent):
         residuals[out_name] = get_res_func(self.options, inputs, outputs[out_name])
 
     def solve_nonlinear(self, inputs, outputs):
+        in_names = self.options['in_names']
         out_name = self.options['out_name']
-        get_res_func = self.options['get_res_func']
+        get_derivs_func = self.options['get_derivs_func']
+        bracket_tol = self.options['bracket_tol']
+        res_tol = self.options['res_tol']
+        method = self.options['method']
+        elementwise = self.options['elementwise']
 
-        xp = np.zeros(self.options['shape'])
-        xn = np.ones(self.options['shape'])
+        xp, xn, rp, rn = self._get_bracket(inputs)
+
+        # With elementwise, once some elements converge, the remaining (active) elements are
+        # compressed into flat arrays, along with their inputs, so only they are passed to
+        # get_res_func. Otherwise, every element stays in the full-shape arrays, and active
+        # marks the ones that are not converged, whose results are still to be stored.
+        active_inputs = {in_name: inputs[in_name] for in_name in in_names}
+        active_indices = np.arange(xp.size)
+        active = np.ones(xp.size, bool)
+        result = np.empty(xp.size)
+
+        # Per-element solver state; xp always has r >= 0 and xn always has r < 0.
+        # Unlike bisection, the other methods may approach the root from one side only,
+        # so their best estimate is the last evaluated point rather than the midpoint.
+        state = dict(xp=xp, xn=xn)
+        if method != 'bisection':
+            state['x_eval'] = 0.5 * xp + 0.5 * xn
+        if method == 'illinois':
+            state['rp'] = rp
+            state['rn'] = rn
+            state['side'] = np.zeros(xp.shape, int)
+        elif method == 'newton':
+            state['x'] = 0.5 * xp + 0.5 * xn
 
         for ind in range(self.options['max_iter']):
-            x = 0.5 * xp + 0.5 * xn
-            r = get_res_func(self.options, inputs, x)
+            xp = state['xp']
+            xn = state['xn']
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                if method == 'illinois':
+                    rp = state['rp']
+                    rn = state['rn']
+                    x = (xp * rn - xn * rp) / (rn - rp)
+                elif method == 'newton':
+                    x = state['x']
+                else:
+                    x = 0.5 * xp + 0.5 * xn
+
+                # Fall back to bisection wherever the update leaves the bracket.
+                if method != 'bisection':
+                    inside = (x > np.minimum(xp, xn)) & (x < np.maximum(xp, xn))
+                    x = np.where(inside, x, 0.5 * xp + 0.5 * xn)
+
+            r = self._get_res(active_inputs, x)
+            if method != 'bisection':
+                state['x_eval'] = x
             mask_p = r >= 0
             mask_n = r < 0
             xp[mask_p] = x[mask_p]
             xn[mask_n] = x[mask_n]
 
-        outputs[out_name] = 0.5 * xp + 0.5 * xn
+            if method == 'illinois':
+                side = state['side']
+                rp[mask_p] = r[mask_p]
+                rn[mask_n] = r[mask_n]
+                rn[mask_p & (side == 1)] *= 0.5
+                rp[mask_n & (side == -1)] *= 0.5
+                side[mask_p] = 1
+                side[mask_n] = -1
+            elif method == 'newton':
+                derivs = get_derivs_func(self.options, active_inputs, x, self.newton_partials)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    state['x'] = x - r / derivs
+
+            mask_r = np.abs(r) <= res_tol
+            mask_x = np.abs(xn - xp) <= bracket_tol
+            converged = (mask_r | mask_x).reshape(-1)
+            if not elementwise:
+                converged &= active
+
+            if not np.any(converged):
+                continue
+
+            indices = active_indices[converged]
+            result[indices] = np.where(mask_r, x, 0.5 * xp + 0.5 * xn).reshape(-1)[converged]
+
+            if not elementwise:
+                active[converged] = False
+                if not np.any(active):
+                    break
+                continue
+
+            remaining = ~converged
+            active_indices = active_indices[remaining]
+            for key in state:
+                state[key] = state[key].reshape(-1)[remaining]
+            for in_name in in_names:
+                active_inputs[in_name] = active_inputs[in_name].reshape(-1)[remaining]
+
+            if active_indices.size == 0:
+                break
+
+        if method == 'bisection':
+            estimate = (0.5 * state['xp'] + 0.5 * state['xn']).reshape(-1)
+        else:
+            estimate = state['x_eval'].reshape(-1)
+
+        if elementwise:
+            result[active_indices] = estimate
+        else:
+            result[active] = estimate[active]
+
+        outputs[out_name] = result.reshape(self.options['shape'])
+
+        if self.options['warm_start']:
+            self.x_prev = outputs[out_name].copy()
+
+    def _get_res(self, inputs, x):
+        get_res_func = self.options['get_res_func']
+
+        # Subsets of the elements are only passed with elementwise, so errors and residuals
+        # of the wrong shape there most likely come from a residual that is not elementwise.
+        subset = np.shape(x) != self.options['shape']
+        try:
+            r = get_res_func(self.options, inputs, x)
+        except (ValueError, IndexError) as error:
+            if not subset:
+                raise
+            raise ValueError(
+                'get_res_func failed on a subset of the elements, of shape {}: {}. A residual '
+                'that is not elementwise requires elementwise=False'.format(
+                    np.shape(x), error)) from error
+
+        if np.shape(r) != np.shape(x):
+            raise ValueError(
+                'get_res_func returned a residual of shape {} for x of shape {}{}'.format(
+                    np.shape(r), np.shape(x),
+                    '; a residual that is not elementwise requires elementwise=False'
+                    if subset else ''))
+
+        return r
+
+    def _get_bracket_end(self, value, inputs):
+        if isinstance(value, function_type):
+            value = value(self.options, inputs)
+
+        return np.array(np.broadcast_to(value, self.options['shape']), float)
+
+    def _get_masked_res(self, inputs, x, mask):
+        # Residual of the masked elements, at the full-shape x; without elementwise, all
+        # the elements are evaluated.
+        in_names = self.options['in_names']
+
+        if not self.options['elementwise']:
+            return self._get_res(inputs, x)[mask]
+
+        masked_inputs = {in_name: inputs[in_name][mask] for in_name in in_names}
+        return self._get_res(masked_inputs, x[mask])
+
+    def _get_bracket(self, inputs):
+        """
+        Return the initial bracket as (xp, xn, rp, rn), where r >= 0 at xp and r < 0 at xn.
+
+        The end residuals are only evaluated when the method, bracket expansion or warm
+        start needs them; otherwise rp and rn are None and the residual is assumed to be
+        nonnegative at the lower end, as in the plain bisection.
+        """
+        shape = self.options['shape']
+        in_names = self.options['in_names']
+
+        lower = self._get_bracket_end(self.options['lower'], inputs)
+        upper = self._get_bracket_end(self.options['upper'], inputs)
+
+        warm_start = self.options['warm_start'] and self.x_prev is not None
+        if warm_start:
+            cold_lower, cold_upper = lower, upper
+            lower = self.x_prev - self.options['warm_start_width']
+            upper = self.x_prev + self.options['warm_start_width']
+
+        evaluate_ends = (
+            warm_start
+            or self.options['method'] == 'illinois'
+            or self.options['max_expand'] > 0
+        )
+        if not evaluate_ends:
+            return lower, upper, None, None
+
+        all_inputs = {in_name: inputs[in_name] for in_name in in_names}
+        r_lower = self._get_res(all_inputs, lower)
+        r_upper = self._get_res(all_inputs, upper)
+
+        for ind in range(self.options['max_expand']):
+            mask = (r_lower >= 0) == (r_upper >= 0)
+            if not np.any(mask):
+                break
+
+            width = upper[mask] - lower[mask]
+            lower[mask] -= width
+            upper[mask] += width
+            r_lower[mask] = self._get_masked_res(inputs, lower, mask)
+            r_upper[mask] = self._get_masked_res(inputs, upper, mask)
+
+        # Warm brackets that still do not straddle the root fall back to the cold bracket.
+        if warm_start:
+            mask = (r_lower >= 0) == (r_upper >= 0)
+            if np.any(mask):
+                lower[mask] = cold_lower[mask]
+                upper[mask] = cold_upper[mask]
+                r_lower[mask] = self._get_masked_res(inputs, lower, mask)
+                r_upper[mask] = self._get_masked_res(inputs, upper, mask)
+
+        flip = r_lower < 0
+        xp = np.where(flip, upper, lower)
+        xn = np.where(flip, lower, upper)
+        rp = np.where(flip, r_upper, r_lower)
+        rn = np.where(flip, r_lower, r_upper)
+
+        return xp, xn, rp, rn
 
     def linearize(self, inputs, outputs, partials):
         out_name = self.options['out_name']
@@ -1,108 +1,417 @@
+import hashlib
+import os
+import zipfile
+from collections import OrderedDict
+
 import numpy as np
 import scipy.sparse
 
 from openmdao.api import ExplicitComponent
 
+from lsdo_utils.miscellaneous.numba_kernels import get_use_numba, bspline_bases_kernel
+
 
-def get_bspline_mtx(num_cp, num_pt, order=4):
+def get_bspline_knots(num_cp, order=4):
+    """
+    Return the clamped, uniformly spaced knot vector for num_cp control points.
+    """
     order = min(order, num_cp)
 
     knots = np.zeros(num_cp + order)
     knots[order-1:num_cp+1] = np.linspace(0, 1, num_cp - order + 2)
     knots[num_cp+1:] = 1.0
 
-    t_vec = np.linspace(0, 1, num_pt)
-
-    basis = np.zeros(order)
-    arange = np.arange(order)
-    data = np.zeros((num_pt, order))
-    rows = np.zeros((num_pt, order), int)
-    cols = np.zeros((num_pt, order), int)
-
-    for ipt in range(num_pt):
-        t = t_vec[ipt]
-
-        i0 = -1
-        for ind in range(order, num_cp+1):
-            if (knots[ind-1] <= t) and (t < knots[ind]):
-                i0 = ind - order
-        if t == knots[-1]:
-            i0 = num_cp - order
-
-        basis[:] = 0.
-        basis[-1] = 1.
-
-        for i in range(2, order+1):
-            l = i - 1
-            j1 = order - l
-            j2 = order
-            n = i0 + j1
-            if knots[n+l] != knots[n]:
-                basis[j1-1] = (knots[n+l] - t) / \
-                              (knots[n+l] - knots[n]) * basis[j1]
-            else:
-                basis[j1-1] = 0.
-            for j in range(j1+1, j2):
-                n = i0 + j
-                if knots[n+l-1] != knots[n-1]:
-                    basis[j-1] = (t - knots[n-1]) / \
-                                (knots[n+l-1] - knots[n-1]) * basis[j-1]
-                else:
-                    basis[j-1] = 0.
-                if knots[n+l] != knots[n]:
-                    basis[j-1] += (knots[n+l] - t) / \
-                                  (knots[n+l] - knots[n]) * basis[j]
-            n = i0 + j2
-            if knots[n+l-1] != knots[n-1]:
-                basis[j2-1] = (t - knots[n-1]) / \
-                              (knots[n+l-1] - knots[n-1]) * basis[j2-1]
-            else:
-                basis[j2-1] = 0.
-
-        data[ipt, :] = basis
-        rows[ipt, :] = ipt
-        cols[ipt, :] = i0 + arange
-
-    data, rows, cols = data.flatten(), rows.flatten(), cols.flatten()
-
-    return scipy.sparse.csr_matrix(
-        (data, (rows, cols)), 
-        shape=(num_pt, num_cp),
-    )
+    return knots
+
+
+def get_bspline_spans(knots, t_vec, num_cp, order):
+    """
+    Return, for every parameter value, the index of the first nonzero basis function.
+
+    All points are located with a single sorted search over the knot vector; points on
+    or beyond the last knot are assigned to the last nonempty span.
+    """
+    i0 = np.searchsorted(knots, t_vec, side='right') - order
+    return np.clip(i0, 0, num_cp - order)
+
+
+def _get_knot_ratio(num, den):
+    nonzero = den != 0.
+    return np.where(nonzero, num / np.where(nonzero, den, 1.), 0.)
+
+
+def _get_bspline_bases_numpy(knots, t_vec, i0, order, min_degree):
+    # Cox-de Boor recursion for all points at once, with the bases of degrees min_degree
+    # and up stored for the derivatives.
+    degree = order - 1
+
+    basis = np.zeros((len(t_vec), order))
+    basis[:, -1] = 1.
+
+    bases = {}
+    if min_degree == 0:
+        bases[0] = basis.copy()
+
+    for i in range(2, order+1):
+        l = i - 1
+        j1 = order - l
+        j2 = order
+
+        n = i0 + j1
+        basis[:, j1-1] = _get_knot_ratio(
+            knots[n+l] - t_vec, knots[n+l] - knots[n]) * basis[:, j1]
+        for j in range(j1+1, j2):
+            n = i0 + j
+            basis[:, j-1] = _get_knot_ratio(
+                t_vec - knots[n-1], knots[n+l-1] - knots[n-1]) * basis[:, j-1]
+            basis[:, j-1] += _get_knot_ratio(
+                knots[n+l] - t_vec, knots[n+l] - knots[n]) * basis[:, j]
+        n = i0 + j2
+        basis[:, j2-1] = _get_knot_ratio(
+            t_vec - knots[n-1], knots[n+l-1] - knots[n-1]) * basis[:, j2-1]
+
+        if min_degree <= l < degree:
+            bases[l] = basis.copy()
+
+    return basis, bases
+
+
+def get_bspline_bases(knots, t_vec, i0, order, derivs=(0,), use_numba=None):
+    """
+    Evaluate the Cox-de Boor recursion for all points at once.
+
+    Returns one array of shape (num_pt, order) per entry of derivs, whose column k holds
+    the value (derivative order 0) or the parametric derivative of basis function i0 + k
+    at each point. Derivatives come from the lower-degree bases of the same recursion, so
+    all of them share the spans and hence the sparsity of the value matrix. With use_numba
+    (or the global setting, if None), the recursion runs point by point in a Numba kernel
+    instead.
+    """
+    t_vec = np.asarray(t_vec, float)
+
+    degree = order - 1
+    min_degree = degree - min(max(derivs), degree)
+
+    if get_use_numba(use_numba, t_vec):
+        levels = np.empty((order if min_degree < degree else 1, len(t_vec), order))
+        bspline_bases_kernel(
+            np.asarray(knots, float), t_vec, np.asarray(i0, np.int64), order, levels)
+
+        basis = levels[-1]
+        bases = {l: levels[l] for l in range(min_degree, degree)}
+    else:
+        basis, bases = _get_bspline_bases_numpy(knots, t_vec, i0, order, min_degree)
+
+    results = []
+    for deriv in derivs:
+        if deriv == 0:
+            results.append(basis)
+        elif deriv > degree:
+            results.append(np.zeros_like(basis))
+        else:
+            values = bases[degree - deriv]
+            for l in range(degree - deriv + 1, degree + 1):
+                values = _differentiate_bspline_basis(knots, i0, values, l)
+            results.append(values)
+
+    return results
+
+
+def _differentiate_bspline_basis(knots, i0, values, l):
+    # Maps (derivatives of) the degree l - 1 basis to the next derivative of the degree l
+    # basis: dN_{g,l} = l N_{g,l-1} / (t_{g+l} - t_g) - l N_{g+1,l-1} / (t_{g+l+1} - t_{g+1}).
+    order = values.shape[1]
+
+    result = np.empty_like(values)
+    for k in range(order):
+        g = i0 + k
+        result[:, k] = l * _get_knot_ratio(values[:, k], knots[g+l] - knots[g])
+        if k + 1 < order:
+            result[:, k] -= l * _get_knot_ratio(values[:, k+1], knots[g+l+1] - knots[g+1])
+
+    return result
+
+
+def get_bspline_basis(knots, t_vec, i0, order, deriv=0, use_numba=None):
+    """
+    Evaluate the basis (or one of its parametric derivatives) for all points at once.
+
+    Returns an array of shape (num_pt, order) whose column k holds the value of
+    basis function i0 + k at each point.
+    """
+    return get_bspline_bases(knots, t_vec, i0, order, (deriv,), use_numba)[0]
+
+
+def get_bspline_mtxs(num_cp, num_pt, order=4, knots=None, t_vec=None, derivs=(0,),
+        use_numba=None):
+    """
+    Return one CSR matrix per entry of derivs, mapping control points to the values or
+    parametric derivatives at the points.
+
+    knots defaults to the clamped uniform knot vector from get_bspline_knots and may be
+    any nondecreasing vector of length num_cp + order. t_vec defaults to num_pt uniformly
+    spaced values over the valid parameter range. The returned matrices share their
+    indices and indptr arrays.
+    """
+    order = min(order, num_cp)
+
+    if knots is None:
+        knots = get_bspline_knots(num_cp, order)
+    else:
+        knots = np.asarray(knots, float)
+        if knots.shape != (num_cp + order,):
+            raise ValueError('knots must have shape ({},), got {}'.format(
+                num_cp + order, knots.shape))
+        if np.any(np.diff(knots) < 0):
+            raise ValueError('knots must be nondecreasing')
+
+    if t_vec is None:
+        t_vec = np.linspace(knots[order-1], knots[num_cp], num_pt)
+    else:
+        t_vec = np.asarray(t_vec, float)
+        if t_vec.shape != (num_pt,):
+            raise ValueError('t_vec must have shape ({},), got {}'.format(num_pt, t_vec.shape))
+
+    i0 = get_bspline_spans(knots, t_vec, num_cp, order)
+    bases = get_bspline_bases(knots, t_vec, i0, order, derivs, use_numba)
+
+    indices = (i0[:, None] + np.arange(order)).flatten()
+    indptr = np.arange(0, order * (num_pt + 1), order)
+
+    mtxs = []
+    for data in bases:
+        mtx = scipy.sparse.csr_matrix(
+            (data.flatten(), indices, indptr),
+            shape=(num_pt, num_cp),
+        )
+        if mtxs:
+            mtx.indices, mtx.indptr = mtxs[0].indices, mtxs[0].indptr
+        mtxs.append(mtx)
+
+    return mtxs
+
+
+def get_bspline_mtx(num_cp, num_pt, order=4, knots=None, t_vec=None, deriv=0, use_numba=None):
+    return get_bspline_mtxs(num_cp, num_pt, order, knots, t_vec, (deriv,), use_numba)[0]
+
+
+class BsplineMtxCache(object):
+    """
+    Bounded LRU cache of B-spline matrices with an optional on-disk store.
+
+    Matrices are keyed on (num_cp, num_pt, order, deriv), the knot vector and the parameter
+    values, but not on use_numba, which only selects how a missing matrix is computed. When
+    cache_dir is set, every computed matrix is also written there as an .npz file so that
+    later runs load it instead of recomputing it. Cached matrices are shared between
+    callers, so their arrays are made read-only.
+    """
+
+    def __init__(self, max_size=64, cache_dir=None):
+        self.max_size = max_size
+        self.cache_dir = cache_dir
+
+        self._mtxs = OrderedDict()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get_stats(self):
+        return dict(
+            hits=self.hits,
+            disk_hits=self.disk_hits,
+            misses=self.misses,
+            size=len(self._mtxs),
+            max_size=self.max_size,
+        )
+
+    def clear(self):
+        self._mtxs.clear()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _get_file_path(self, key):
+        digest = hashlib.sha1()
+        for item in key:
+            digest.update(item if isinstance(item, bytes) else repr(item).encode())
+
+        return os.path.join(self.cache_dir, 'bspline_mtx_{}.npz'.format(digest.hexdigest()))
+
+    def _load(self, key):
+        file_path = self._get_file_path(key)
+        if not os.path.exists(file_path):
+            return None
+
+        # A missing, truncated or foreign file is recomputed.
+        try:
+            return scipy.sparse.load_npz(file_path).tocsr()
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            return None
+
+    def _save(self, key, mtx):
+        file_path = self._get_file_path(key)
+        tmp_path = '{}.{}.tmp.npz'.format(file_path[:-4], os.getpid())
+
+        # The disk store is only an optimization, so failing to write it is not an error.
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            scipy.sparse.save_npz(tmp_path, mtx, compressed=False)
+            os.replace(tmp_path, file_path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def get_mtx(self, num_cp, num_pt, order=4, knots=None, t_vec=None, deriv=0, use_numba=None):
+        order = min(order, num_cp)
+
+        if knots is None:
+            knots = get_bspline_knots(num_cp, order)
+        knots = np.asarray(knots, float)
+
+        if t_vec is not None:
+            t_vec = np.asarray(t_vec, float)
+
+        key = (
+            num_cp, num_pt, order, deriv, knots.tobytes(),
+            None if t_vec is None else t_vec.tobytes(),
+        )
+
+        if key in self._mtxs:
+            self._mtxs.move_to_end(key)
+            self.hits += 1
+            return self._mtxs[key]
+
+        mtx = None
+        if self.cache_dir is not None:
+            mtx = self._load(key)
+
+        if mtx is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            mtx = get_bspline_mtx(num_cp, num_pt, order, knots, t_vec, deriv, use_numba)
+            if self.cache_dir is not None:
+                self._save(key, mtx)
+
+        for array in [mtx.data, mtx.indices, mtx.indptr]:
+            array.flags.writeable = False
+
+        self._mtxs[key] = mtx
+        while len(self._mtxs) > self.max_size:
+            self._mtxs.popitem(last=False)
+
+        return mtx
+
+
+bspline_mtx_cache = BsplineMtxCache(cache_dir=os.environ.get('LSDO_UTILS_CACHE_DIR'))
+
+
+def get_cached_bspline_mtx(num_cp, num_pt, order=4, knots=None, t_vec=None, deriv=0,
+        use_numba=None):
+    return bspline_mtx_cache.get_mtx(num_cp, num_pt, order, knots, t_vec, deriv, use_numba)
+
+
+def get_block_diagonal_indices(mtx, shape):
+    """
+    Return the rows and cols of the block-diagonal matrix with one copy of mtx per index
+    of the batch shape, in the entry order of mtx.tocoo().
+
+    The base entries are offset once per block by broadcasting rather than replicated.
+    """
+    coo = mtx.tocoo()
+    batch = np.arange(int(np.prod(shape)))[:, np.newaxis]
+
+    rows = (batch * mtx.shape[0] + coo.row).flatten()
+    cols = (batch * mtx.shape[1] + coo.col).flatten()
+
+    return rows, cols
+
+
+def apply_batched_mtx(mtx, array):
+    """
+    Multiply mtx into the last axis of array with a single sparse-times-dense product.
+    """
+    shape = array.shape[:-1]
+    return mtx.dot(array.reshape((-1, mtx.shape[1])).T).T.reshape(shape + (mtx.shape[0],))
 
 
 class BsplineComp(ExplicitComponent):
     """
     General function to translate from control points to actual points
     using a b-spline representation.
+
+    With a batch shape, the input has shape shape + (num_cp,) and the output has shape
+    shape + (num_pt,), i.e., one independent curve per leading index. use_numba is passed
+    to get_bspline_mtx when jac is not given.
     """
 
     def initialize(self):
         self.options.declare('num_pt', types=int)
         self.options.declare('num_cp', types=int)
-        self.options.declare('jac')
+        self.options.declare('order', default=4, types=int)
+        self.options.declare('jac', default=None, allow_none=True)
+        self.options.declare('shape', default=(), types=tuple)
         self.options.declare('in_name', types=str)
         self.options.declare('out_name', types=str)
+        self.options.declare('use_numba', default=None, types=bool, allow_none=True)
 
     def setup(self):
         num_pt = self.options['num_pt']
         num_cp = self.options['num_cp']
-        jac = self.options['jac']
+        order = self.options['order']
+        shape = self.options['shape']
         in_name = self.options['in_name']
         out_name = self.options['out_name']
 
-        self.add_input(in_name, shape=num_cp)
-        self.add_output(out_name, shape=num_pt)
+        self.jac = self.options['jac']
+        if self.jac is None:
+            self.jac = get_cached_bspline_mtx(
+                num_cp, num_pt, order, use_numba=self.options['use_numba'])
 
-        jac = self.options['jac'].tocoo()
+        self.add_input(in_name, shape=shape + (num_cp,))
+        self.add_output(out_name, shape=shape + (num_pt,))
 
-        self.declare_partials(out_name, in_name, val=jac.data, rows=jac.row, cols=jac.col)
+        rows, cols = get_block_diagonal_indices(self.jac, shape)
+        vals = np.tile(self.jac.tocoo().data, int(np.prod(shape)))
+
+        self.declare_partials(out_name, in_name, val=vals, rows=rows, cols=cols)
 
     def compute(self, inputs, outputs):
         num_pt = self.options['num_pt']
         num_cp = self.options['num_cp']
-        jac = self.options['jac']
+        shape = self.options['shape']
         in_name = self.options['in_name']
         out_name = self.options['out_name']
 
-        outputs[out_name] = jac * inputs[in_name]
\ No newline at end of file
+        outputs[out_name] = apply_batched_mtx(self.jac, inputs[in_name])
+
+
+if __name__ == '__main__':
+    from openmdao.api import Problem, IndepVarComp
+
+    num_cp = 6
+    num_pt = 20
+    shape = (3, 4)
+
+    prob = Problem()
+
+    comp = IndepVarComp()
+    comp.add_output('cp', val=np.random.rand(*shape, num_cp))
+    prob.model.add_subsystem('ivc', comp, promotes=['*'])
+
+    comp = BsplineComp(
+        num_cp=num_cp,
+        num_pt=num_pt,
+        shape=shape,
+        in_name='cp',
+        out_name='pt',
+    )
+    prob.model.add_subsystem('comp', comp, promotes=['*'])
+
+    prob.setup()
+    prob.run_model()
+    prob.check_partials(compact_print=True)
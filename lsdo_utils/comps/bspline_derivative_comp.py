@@ -0,0 +1,99 @@
+import numpy as np
+
+from openmdao.api import ExplicitComponent
+
+from lsdo_utils.comps.bspline_comp import get_bspline_mtxs
+from lsdo_utils.comps.bspline_comp import get_block_diagonal_indices, apply_batched_mtx
+
+
+class BsplineDerivativeComp(ExplicitComponent):
+    """
+    B-spline map from control points to the values and first and second parametric
+    derivatives at arbitrary parameter locations t_vec, with optional non-uniform knots.
+
+    Any of out_name, dt_name and dt2_name may be omitted. All requested outputs come
+    from one basis evaluation and share the same Jacobian rows and cols.
+    """
+
+    def initialize(self):
+        self.options.declare('num_pt', types=int)
+        self.options.declare('num_cp', types=int)
+        self.options.declare('order', default=4, types=int)
+        self.options.declare('knots', default=None, types=np.ndarray, allow_none=True)
+        self.options.declare('t_vec', default=None, types=np.ndarray, allow_none=True)
+        self.options.declare('shape', default=(), types=tuple)
+        self.options.declare('in_name', types=str)
+        self.options.declare('out_name', default=None, types=str, allow_none=True)
+        self.options.declare('dt_name', default=None, types=str, allow_none=True)
+        self.options.declare('dt2_name', default=None, types=str, allow_none=True)
+
+    def setup(self):
+        num_pt = self.options['num_pt']
+        num_cp = self.options['num_cp']
+        order = self.options['order']
+        knots = self.options['knots']
+        t_vec = self.options['t_vec']
+        shape = self.options['shape']
+        in_name = self.options['in_name']
+
+        self.out_names = {}
+        for deriv, name in enumerate(['out_name', 'dt_name', 'dt2_name']):
+            if self.options[name] is not None:
+                self.out_names[deriv] = self.options[name]
+
+        if not self.out_names:
+            raise ValueError('At least one of out_name, dt_name or dt2_name must be given')
+
+        derivs = list(self.out_names)
+        mtxs = get_bspline_mtxs(num_cp, num_pt, order, knots, t_vec, derivs)
+        self.mtxs = dict(zip(derivs, mtxs))
+
+        self.add_input(in_name, shape=shape + (num_cp,))
+
+        rows, cols = get_block_diagonal_indices(mtxs[0], shape)
+        num_batch = int(np.prod(shape))
+
+        for deriv, out_name in self.out_names.items():
+            self.add_output(out_name, shape=shape + (num_pt,))
+
+            vals = np.tile(self.mtxs[deriv].tocoo().data, num_batch)
+            self.declare_partials(out_name, in_name, val=vals, rows=rows, cols=cols)
+
+    def compute(self, inputs, outputs):
+        in_name = self.options['in_name']
+
+        for deriv, out_name in self.out_names.items():
+            outputs[out_name] = apply_batched_mtx(self.mtxs[deriv], inputs[in_name])
+
+
+if __name__ == '__main__':
+    from openmdao.api import Problem, IndepVarComp
+
+    num_cp = 8
+    num_pt = 25
+    shape = (3,)
+
+    # Points clustered at both ends of the span.
+    t_vec = 0.5 - 0.5 * np.cos(np.linspace(0., np.pi, num_pt))
+
+    prob = Problem()
+
+    comp = IndepVarComp()
+    comp.add_output('cp', val=np.random.rand(*shape, num_cp))
+    prob.model.add_subsystem('ivc', comp, promotes=['*'])
+
+    comp = BsplineDerivativeComp(
+        num_cp=num_cp,
+        num_pt=num_pt,
+        t_vec=t_vec,
+        shape=shape,
+        in_name='cp',
+        out_name='pt',
+        dt_name='dpt_dt',
+        dt2_name='d2pt_dt2',
+    )
+    prob.model.add_subsystem('comp', comp, promotes=['*'])
+
+    prob.setup()
+    prob.run_model()
+    prob.check_partials(compact_print=True)
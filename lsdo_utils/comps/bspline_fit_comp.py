@@ -0,0 +1,135 @@
+import numpy as np
+import scipy.linalg
+
+from openmdao.api import ExplicitComponent
+
+from lsdo_utils.comps.bspline_comp import get_cached_bspline_mtx
+
+
+class BsplineFitComp(ExplicitComponent):
+    """
+    Least-squares fit of B-spline control points to a dense distribution of points.
+
+    This is the inverse map of BsplineComp: cp = (A^T A)^-1 A^T pt, with A the B-spline
+    matrix. A^T A is banded, so its Cholesky factor is computed once at setup and every
+    compute and Jacobian-vector product costs one sparse product and a pair of banded
+    triangular solves. The component is matrix-free. use_numba is passed to get_bspline_mtx
+    when jac is not given.
+    """
+
+    def initialize(self):
+        self.options.declare('num_pt', types=int)
+        self.options.declare('num_cp', types=int)
+        self.options.declare('order', default=4, types=int)
+        self.options.declare('jac', default=None, allow_none=True)
+        self.options.declare('shape', default=(), types=tuple)
+        self.options.declare('in_name', types=str)
+        self.options.declare('out_name', types=str)
+        self.options.declare('use_numba', default=None, types=bool, allow_none=True)
+
+    def setup(self):
+        num_pt = self.options['num_pt']
+        num_cp = self.options['num_cp']
+        order = self.options['order']
+        shape = self.options['shape']
+        in_name = self.options['in_name']
+        out_name = self.options['out_name']
+
+        if num_pt < num_cp:
+            raise ValueError(
+                'BsplineFitComp requires at least as many points as control points, '
+                'got num_pt={} < num_cp={}'.format(num_pt, num_cp))
+
+        jac = self.options['jac']
+        if jac is None:
+            jac = get_cached_bspline_mtx(
+                num_cp, num_pt, order, use_numba=self.options['use_numba'])
+        self.jac = jac = jac.tocsr()
+
+        # Upper banded storage of the normal matrix, as expected by cholesky_banded, filled
+        # from its nonzero entries: ab[bandwidth + i - j, j] = (A^T A)[i, j] for i <= j.
+        normal_mtx = jac.T.dot(jac).tocoo()
+        normal_mtx.sum_duplicates()
+        upper = normal_mtx.col >= normal_mtx.row
+        rows = normal_mtx.row[upper]
+        cols = normal_mtx.col[upper]
+        bandwidth = int(np.max(cols - rows))
+
+        banded = np.zeros((bandwidth + 1, num_cp))
+        banded[bandwidth + rows - cols, cols] = normal_mtx.data[upper]
+
+        self.cholesky = scipy.linalg.cholesky_banded(banded)
+
+        self.add_input(in_name, shape=shape + (num_pt,))
+        self.add_output(out_name, shape=shape + (num_cp,))
+
+        self.matrix_free = True
+
+    def _solve(self, rhs):
+        # rhs has shape (num_cp, num_batch).
+        return scipy.linalg.cho_solve_banded((self.cholesky, False), rhs)
+
+    def _apply(self, array):
+        num_pt = self.options['num_pt']
+        num_cp = self.options['num_cp']
+        shape = self.options['shape']
+
+        rhs = self.jac.T.dot(array.reshape((-1, num_pt)).T)
+        return self._solve(rhs).T.reshape(shape + (num_cp,))
+
+    def _apply_transpose(self, array):
+        num_pt = self.options['num_pt']
+        num_cp = self.options['num_cp']
+        shape = self.options['shape']
+
+        sol = self._solve(array.reshape((-1, num_cp)).T)
+        return self.jac.dot(sol).T.reshape(shape + (num_pt,))
+
+    def compute(self, inputs, outputs):
+        in_name = self.options['in_name']
+        out_name = self.options['out_name']
+
+        outputs[out_name] = self._apply(inputs[in_name])
+
+    def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
+        in_name = self.options['in_name']
+        out_name = self.options['out_name']
+
+        if out_name not in d_outputs or in_name not in d_inputs:
+            return
+
+        if mode == 'fwd':
+            d_outputs[out_name] += self._apply(d_inputs[in_name])
+        else:
+            d_inputs[in_name] += self._apply_transpose(d_outputs[out_name])
+
+
+if __name__ == '__main__':
+    from openmdao.api import Problem, IndepVarComp
+
+    num_cp = 10
+    num_pt = 50
+    shape = (2,)
+
+    t_vec = np.linspace(0., 1., num_pt)
+
+    prob = Problem()
+
+    comp = IndepVarComp()
+    comp.add_output('pt', val=np.outer(np.arange(1, 3), np.sin(np.pi * t_vec)))
+    prob.model.add_subsystem('ivc', comp, promotes=['*'])
+
+    comp = BsplineFitComp(
+        num_cp=num_cp,
+        num_pt=num_pt,
+        shape=shape,
+        in_name='pt',
+        out_name='cp',
+    )
+    prob.model.add_subsystem('comp', comp, promotes=['*'])
+
+    prob.setup()
+    prob.run_model()
+    prob.check_partials(compact_print=True)
+
+    print(prob['cp'])
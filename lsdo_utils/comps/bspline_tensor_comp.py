@@ -0,0 +1,157 @@
+import itertools
+
+import numpy as np
+import scipy.sparse
+
+from openmdao.api import ExplicitComponent
+
+from lsdo_utils.comps.bspline_comp import get_cached_bspline_mtx
+
+
+def apply_bspline_mtxs(mtxs, array, axes):
+    """
+    Apply one sparse matrix per axis of array, in the given axis order.
+    """
+    for axis in axes:
+        mtx = mtxs[axis]
+        array = np.moveaxis(array, axis, 0)
+        shape = array.shape
+        array = mtx.dot(array.reshape(shape[0], -1)).reshape((mtx.shape[0],) + shape[1:])
+        array = np.moveaxis(array, 0, axis)
+
+    return array
+
+
+class BsplineTensorComp(ExplicitComponent):
+    """
+    Tensor-product B-spline map from a control net of shape num_cp to points of shape num_pt.
+
+    The per-axis matrices are applied in sequence, so the full Kronecker product is never
+    formed unless form_kron is set. The Jacobian sparsity is assembled directly from the
+    per-axis entries, or skipped altogether in matrix_free mode.
+    """
+
+    def initialize(self):
+        self.options.declare('num_cp', types=tuple)
+        self.options.declare('num_pt', types=tuple)
+        self.options.declare('order', default=4, types=(int, tuple))
+        self.options.declare('in_name', types=str)
+        self.options.declare('out_name', types=str)
+        self.options.declare('form_kron', default=False, types=bool)
+        self.options.declare('matrix_free', default=False, types=bool)
+
+    def setup(self):
+        num_cp = self.options['num_cp']
+        num_pt = self.options['num_pt']
+        order = self.options['order']
+        in_name = self.options['in_name']
+        out_name = self.options['out_name']
+
+        if len(num_cp) != len(num_pt):
+            raise ValueError('num_cp {} and num_pt {} must have the same rank'.format(
+                num_cp, num_pt))
+
+        rank = len(num_cp)
+
+        if isinstance(order, int):
+            order = (order,) * rank
+
+        self.mtxs = mtxs = [
+            get_cached_bspline_mtx(num_cp[axis], num_pt[axis], order[axis])
+            for axis in range(rank)
+        ]
+
+        # Pick the axis order with the fewest multiply-adds; the intermediate shapes, and
+        # hence the cost, depend on which axes have already been expanded.
+        def get_cost(axes):
+            shape = list(num_cp)
+            cost = 0
+            for axis in axes:
+                cost += mtxs[axis].nnz * np.prod(shape) // shape[axis]
+                shape[axis] = num_pt[axis]
+            return cost
+
+        self.fwd_axes = min(itertools.permutations(range(rank)), key=get_cost)
+        self.rev_axes = self.fwd_axes[::-1]
+
+        self.add_input(in_name, shape=num_cp)
+        self.add_output(out_name, shape=num_pt)
+
+        if self.options['form_kron']:
+            kron = mtxs[0]
+            for mtx in mtxs[1:]:
+                kron = scipy.sparse.kron(kron, mtx)
+            self.kron = kron.tocsr()
+
+        self.matrix_free = self.options['matrix_free']
+        if self.matrix_free:
+            return
+
+        coos = [mtx.tocoo() for mtx in mtxs]
+
+        rows = 0
+        cols = 0
+        vals = 1.
+        for axis, coo in enumerate(coos):
+            index = [np.newaxis] * rank
+            index[axis] = slice(None)
+            index = tuple(index)
+
+            rows = rows * num_pt[axis] + coo.row[index]
+            cols = cols * num_cp[axis] + coo.col[index]
+            vals = vals * coo.data[index]
+
+        self.declare_partials(
+            out_name, in_name,
+            val=vals.flatten(), rows=rows.flatten(), cols=cols.flatten(),
+        )
+
+    def compute(self, inputs, outputs):
+        num_pt = self.options['num_pt']
+        in_name = self.options['in_name']
+        out_name = self.options['out_name']
+
+        if self.options['form_kron']:
+            outputs[out_name] = self.kron.dot(inputs[in_name].flatten()).reshape(num_pt)
+        else:
+            outputs[out_name] = apply_bspline_mtxs(self.mtxs, inputs[in_name], self.fwd_axes)
+
+    def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
+        in_name = self.options['in_name']
+        out_name = self.options['out_name']
+
+        if mode == 'fwd':
+            if out_name in d_outputs and in_name in d_inputs:
+                d_outputs[out_name] += apply_bspline_mtxs(
+                    self.mtxs, d_inputs[in_name], self.fwd_axes)
+        else:
+            if out_name in d_outputs and in_name in d_inputs:
+                d_inputs[in_name] += apply_bspline_mtxs(
+                    [mtx.T for mtx in self.mtxs], d_outputs[out_name], self.rev_axes)
+
+
+if __name__ == '__main__':
+    from openmdao.api import Problem, IndepVarComp
+
+    num_cp = (5, 6)
+    num_pt = (20, 30)
+
+    for matrix_free in [False, True]:
+        prob = Problem()
+
+        comp = IndepVarComp()
+        comp.add_output('cp', val=np.random.rand(*num_cp))
+        prob.model.add_subsystem('ivc', comp, promotes=['*'])
+
+        comp = BsplineTensorComp(
+            num_cp=num_cp,
+            num_pt=num_pt,
+            in_name='cp',
+            out_name='pt',
+            matrix_free=matrix_free,
+        )
+        prob.model.add_subsystem('comp', comp, promotes=['*'])
+
+        prob.setup()
+        prob.run_model()
+        prob.check_partials(compact_print=True)
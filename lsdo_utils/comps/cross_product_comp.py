@@ -3,14 +3,39 @@ import numpy as np
 
 from openmdao.api import ExplicitComponent
 
-from lsdo_utils.miscellaneous_functions.get_array_indices import get_array_indices
+from lsdo_utils.miscellaneous_functions.get_grid_indices import get_grid_indices
 
 
-alphabet = 'abcdefghij'
-
 def insert_3_into_tuple(shape, index):
     return shape[:index] + (3,) + shape[index:]
 
+def fill_cross_product_partials(in1, in2, in1_index, in2_index, d_in1, d_in2):
+    """
+    Fill the partials of cross(in1, in2) into preallocated buffers of shape
+    shape_no_3 + (3, 3), indexed by (out component, in component).
+
+    The derivative with respect to in1 is the skew-symmetric matrix of -in2 and the one
+    with respect to in2 is that of in1, so every entry is a copy or negation of an input
+    component; only the off-diagonal entries are written.
+    """
+    a = np.moveaxis(in1, in1_index, -1)
+    b = np.moveaxis(in2, in2_index, -1)
+
+    d_in1[..., 0, 1] = b[..., 2]
+    np.negative(b[..., 1], out=d_in1[..., 0, 2])
+    np.negative(b[..., 2], out=d_in1[..., 1, 0])
+    d_in1[..., 1, 2] = b[..., 0]
+    d_in1[..., 2, 0] = b[..., 1]
+    np.negative(b[..., 0], out=d_in1[..., 2, 1])
+
+    np.negative(a[..., 2], out=d_in2[..., 0, 1])
+    d_in2[..., 0, 2] = a[..., 1]
+    d_in2[..., 1, 0] = a[..., 2]
+    np.negative(a[..., 0], out=d_in2[..., 1, 2])
+    np.negative(a[..., 1], out=d_in2[..., 2, 0])
+    d_in2[..., 2, 1] = a[..., 0]
+
+
 class CrossProductComp(ExplicitComponent):
 
     def initialize(self):
@@ -21,6 +46,7 @@ class CrossProductComp(ExplicitComponent):
         self.options.declare('in1_name', types=str)
         self.options.declare('in2_name', types=str)
         self.options.declare('out_name', types=str)
+        self.options.declare('matrix_free', default=False, types=bool)
 
     def setup(self):
         shape_no_3 = self.options['shape_no_3']
@@ -39,50 +65,33 @@ class CrossProductComp(ExplicitComponent):
         self.add_input(in2_name, shape=in2_shape)
         self.add_output(out_name, shape=out_shape)
 
-        in1_indices = get_array_indices(*in1_shape)
-        in2_indices = get_array_indices(*in2_shape)
-        out_indices = get_array_indices(*out_shape)
-
-        ones = np.ones(3, int)
+        # In matrix-free mode, no partials are stored; compute_jacvec_product works
+        # directly on the seeds and the inputs.
+        self.matrix_free = self.options['matrix_free']
+        if self.matrix_free:
+            return
 
+        # The partials are enumerated over shape_no_3 + (3, 3), with the last two axes the
+        # out and in vector components, so each index array is the flat index into an
+        # array with the 3 moved to the corresponding position.
         rank = len(shape_no_3)
-        def get_einsum_string_rows(index):
-            return '{}m{},n->{}{}mn'.format(
-                alphabet[:index], alphabet[index:rank],
-                alphabet[:index], alphabet[index:rank],
-            )
-        def get_einsum_string_cols(index):
-            return '{}m{},n->{}{}nm'.format(
-                alphabet[:index], alphabet[index:rank],
-                alphabet[:index], alphabet[index:rank],
-            )
-
-        rows = np.einsum(
-            get_einsum_string_rows(out_index),
-            out_indices, ones,
-        ).flatten()
-        cols = np.einsum(
-            get_einsum_string_cols(in1_index),
-            in1_indices, ones,
-        ).flatten()
+        grid_shape = shape_no_3 + (3, 3)
+        def get_axes(index, component_axis):
+            axes = list(range(rank))
+            axes.insert(index, component_axis)
+            return axes
+
+        rows = get_grid_indices(grid_shape, get_axes(out_index, rank))
+        cols = get_grid_indices(grid_shape, get_axes(in1_index, rank + 1))
         self.declare_partials(out_name, in1_name, rows=rows, cols=cols)
 
-        rows = np.einsum(
-            get_einsum_string_rows(out_index),
-            out_indices, ones,
-        ).flatten()
-        cols = np.einsum(
-            get_einsum_string_cols(in2_index),
-            in2_indices, ones,
-        ).flatten()
+        cols = get_grid_indices(grid_shape, get_axes(in2_index, rank + 1))
         self.declare_partials(out_name, in2_name, rows=rows, cols=cols)
 
-        # rows = np.einsum('i...,j->i...j', indices, ones).flatten()
-        # cols = np.einsum('j...,i->i...j', indices, ones).flatten()
-        # self.declare_partials(out_name, in1_name, rows=rows, cols=cols)
-        # self.declare_partials(out_name, in2_name, rows=rows, cols=cols)
-
-        # self.set_check_partial_options('*', method='cs')
+        # Partials buffers of shape shape_no_3 + (3, 3), indexed by (out, in) component
+        # in the same order as rows and cols; the diagonal entries stay zero.
+        self.d_in1 = np.zeros(shape_no_3 + (3, 3))
+        self.d_in2 = np.zeros(shape_no_3 + (3, 3))
 
     def compute(self, inputs, outputs):
         in1_index = self.options['in1_index']
@@ -100,7 +109,24 @@ class CrossProductComp(ExplicitComponent):
         )
 
     def compute_partials(self, inputs, partials):
-        shape_no_3 = self.options['shape_no_3']
+        if self.matrix_free:
+            return
+
+        in1_index = self.options['in1_index']
+        in2_index = self.options['in2_index']
+        in1_name = self.options['in1_name']
+        in2_name = self.options['in2_name']
+        out_name = self.options['out_name']
+
+        fill_cross_product_partials(
+            inputs[in1_name], inputs[in2_name], in1_index, in2_index,
+            self.d_in1, self.d_in2,
+        )
+
+        partials[out_name, in1_name] = self.d_in1.reshape(-1)
+        partials[out_name, in2_name] = self.d_in2.reshape(-1)
+
+    def compute_jacvec_product(self, inputs, d_inputs, d_outputs, mode):
         in1_index = self.options['in1_index']
         in2_index = self.options['in2_index']
         out_index = self.options['out_index']
@@ -108,65 +134,39 @@ class CrossProductComp(ExplicitComponent):
         in2_name = self.options['in2_name']
         out_name = self.options['out_name']
 
-        ones = np.ones(3)
-        eye = np.eye(3)
-        rank = len(shape_no_3)
+        if out_name not in d_outputs:
+            return
 
-        tmps = {0: None, 1: None, 2: None}
-        for ind in range(3):
-            array = np.einsum(
-                '...,m->...m',
-                np.ones(shape_no_3), 
-                eye[ind, :],
-            )
-            
-            array = np.einsum(
-                '...,m->...m',
-                np.cross(
-                    np.einsum(
-                        '...,m->...m',
-                        np.ones(shape_no_3), 
-                        eye[ind, :],
-                    ), 
-                    inputs[in2_name], 
-                    axisa=-1,
+        if mode == 'fwd':
+            if in1_name in d_inputs:
+                d_outputs[out_name] += np.cross(
+                    d_inputs[in1_name], inputs[in2_name],
+                    axisa=in1_index,
                     axisb=in2_index,
-                    axisc=-1,
-                ),
-                eye[ind, :],
-            )
-
-            tmps[ind] = array
-
-        partials[out_name, in1_name] = (tmps[0] + tmps[1] + tmps[2]).flatten()
-
-        tmps = {0: None, 1: None, 2: None}
-        for ind in range(3):
-            array = np.einsum(
-                '...,m->...m',
-                np.ones(shape_no_3), 
-                eye[ind, :],
-            )
-            
-            array = np.einsum(
-                '...,m->...m',
-                np.cross(
-                    inputs[in1_name], 
-                    np.einsum(
-                        '...,m->...m',
-                        np.ones(shape_no_3), 
-                        eye[ind, :],
-                    ), 
+                    axisc=out_index,
+                )
+            if in2_name in d_inputs:
+                d_outputs[out_name] += np.cross(
+                    inputs[in1_name], d_inputs[in2_name],
                     axisa=in1_index,
-                    axisb=-1,
-                    axisc=-1,
-                ),
-                eye[ind, :],
-            )
-
-            tmps[ind] = array
-
-        partials[out_name, in2_name] = (tmps[0] + tmps[1] + tmps[2]).flatten()
+                    axisb=in2_index,
+                    axisc=out_index,
+                )
+        else:
+            if in1_name in d_inputs:
+                d_inputs[in1_name] += np.cross(
+                    inputs[in2_name], d_outputs[out_name],
+                    axisa=in2_index,
+                    axisb=out_index,
+                    axisc=in1_index,
+                )
+            if in2_name in d_inputs:
+                d_inputs[in2_name] += np.cross(
+                    d_outputs[out_name], inputs[in1_name],
+                    axisa=out_index,
+                    axisb=in1_index,
+                    axisc=in2_index,
+                )
 
 
 if __name__ == '__main__':
@@ -0,0 +1,247 @@
+import numpy as np
+
+from lsdo_utils.comps.array_explicit_component import ArrayExplicitComponent
+from lsdo_utils.miscellaneous_functions.process_options import name_types, get_names_list
+
+
+class _ArrayDict(dict):
+    # Inputs and outputs of the components of the chain: values set by a component are
+    # copied into the preallocated arrays, which the next components then read.
+
+    def __setitem__(self, key, val):
+        self[key][...] = val
+
+
+class FusedArrayComp(ArrayExplicitComponent):
+    """
+    Chain of ArrayExplicitComponent instances of the same shape, evaluated as one component.
+
+    The components are given, in evaluation order, in comps, and are not added to the model
+    themselves. An input of a component that is an output of a previous one is connected to
+    it internally; the other inputs are the inputs of this component. Its outputs are
+    out_names, by default the outputs not used by any component of the chain. The
+    intermediate values are kept in preallocated arrays, and the diagonal partials are
+    combined with the chain rule, so only the partials with respect to the external inputs
+    are declared.
+    """
+
+    def array_initialize(self):
+        self.options.declare('comps', types=list)
+        self.options.declare('out_names', default=None, types=name_types, allow_none=True)
+
+    def array_setup(self):
+        comps = self.options['comps']
+
+        in_names = []
+        out_names = []
+        used_names = set()
+        var_args = {}
+
+        # External inputs each partial depends on, keyed by variable name.
+        self.fused_deps = deps = {}
+
+        # For each component, the list of (out_name, ext_name, in_names) of the chain rule.
+        self.fused_plans = plans = []
+
+        for comp in comps:
+            if not isinstance(comp, ArrayExplicitComponent):
+                raise TypeError('FusedArrayComp requires ArrayExplicitComponent instances')
+            if comp.options['shape'] != self.var_shape:
+                raise ValueError('FusedArrayComp requires components of shape {}'.format(
+                    self.var_shape))
+
+            comp.array_record_setup()
+
+            for in_name in comp.array_in_names:
+                used_names.add(in_name)
+                if in_name not in deps:
+                    if in_name in comp.array_out_names:
+                        raise ValueError('{} is both an input and an output'.format(in_name))
+                    in_names.append(in_name)
+                    var_args[in_name] = comp.array_var_args[in_name]
+                    deps[in_name] = [in_name]
+
+            plan = []
+            for out_name in comp.array_out_names:
+                if out_name in deps:
+                    raise ValueError('{} is used or computed by more than one component'.format(
+                        out_name))
+                out_names.append(out_name)
+                var_args[out_name] = comp.array_var_args[out_name]
+
+                wrt = [
+                    in_name for in_name in comp.array_in_names
+                    if (out_name, in_name) in comp.array_partials
+                ]
+                deps[out_name] = [
+                    ext_name for ext_name in in_names
+                    if any(ext_name in deps[in_name] for in_name in wrt)
+                ]
+                for ext_name in deps[out_name]:
+                    plan.append((out_name, ext_name, [
+                        in_name for in_name in wrt if ext_name in deps[in_name]]))
+            plans.append(plan)
+
+        if self.options['out_names'] is None:
+            self.options['out_names'] = [
+                out_name for out_name in out_names if out_name not in used_names]
+        self.options['out_names'] = get_names_list(self.options['out_names'])
+
+        for out_name in self.options['out_names']:
+            if out_name not in out_names:
+                raise ValueError('{} is not an output of the chain'.format(out_name))
+
+        self.fused_in_names = in_names
+        self.fused_out_names = out_names
+
+        for in_name in in_names:
+            args, kwargs = var_args[in_name]
+            self.array_add_input(in_name, *args, **kwargs)
+        for out_name in self.options['out_names']:
+            args, kwargs = var_args[out_name]
+            self.array_add_output(out_name, *args, **kwargs)
+            for in_name in deps[out_name]:
+                self.array_declare_partials(out_name, in_name)
+
+        # Intermediate values keyed by dtype for complex step.
+        self.fused_values = {}
+
+        # Derivatives of the outputs of the chain with respect to the external inputs.
+        self.fused_derivs = {}
+        for in_name in in_names:
+            self.fused_derivs[in_name, in_name] = 1.
+        for plan in plans:
+            for out_name, ext_name, wrt in plan:
+                self.fused_derivs[out_name, ext_name] = np.empty(self.var_size)
+        self.fused_scratch = np.empty(self.var_size)
+
+    def _get_values(self, dtype):
+        if dtype not in self.fused_values:
+            values = self.fused_values[dtype] = _ArrayDict()
+            for out_name in self.fused_out_names:
+                dict.__setitem__(values, out_name, np.zeros(self.var_shape, dtype))
+
+        return self.fused_values[dtype]
+
+    def _run_chain(self, inputs):
+        in_names = self.fused_in_names
+
+        dtype = np.result_type(*[inputs[in_name] for in_name in in_names])
+        values = self._get_values(dtype)
+
+        # The external inputs are passed as they are, since nothing writes into them.
+        for in_name in in_names:
+            dict.__setitem__(values, in_name, inputs[in_name])
+
+        for comp in self.options['comps']:
+            comp.compute(values, values)
+
+        self.array_cache_inputs(inputs)
+        return values
+
+    def compute(self, inputs, outputs):
+        values = self._run_chain(inputs)
+
+        for out_name in self.options['out_names']:
+            outputs[out_name] = values[out_name]
+
+    def compute_partials(self, inputs, partials):
+        comps = self.options['comps']
+        derivs = self.fused_derivs
+        scratch = self.fused_scratch
+
+        if self.array_inputs_unchanged(inputs):
+            values = self._get_values(np.result_type(
+                *[inputs[in_name] for in_name in self.fused_in_names]))
+            for in_name in self.fused_in_names:
+                dict.__setitem__(values, in_name, inputs[in_name])
+        else:
+            values = self._run_chain(inputs)
+
+        for comp, plan in zip(comps, self.fused_plans):
+            comp.compute_partials(values, comp.array_partials)
+
+            for out_name, ext_name, wrt in plan:
+                deriv = derivs[out_name, ext_name]
+                for ind, in_name in enumerate(wrt):
+                    partial = np.reshape(comp.array_partials[out_name, in_name], -1)
+                    if ind == 0:
+                        np.multiply(partial, derivs[in_name, ext_name], out=deriv)
+                    else:
+                        np.multiply(partial, derivs[in_name, ext_name], out=scratch)
+                        deriv += scratch
+
+        for out_name in self.options['out_names']:
+            for in_name in self.fused_deps[out_name]:
+                partials[out_name, in_name] = derivs[out_name, in_name]
+
+
+if __name__ == '__main__':
+    from openmdao.api import Problem, IndepVarComp
+
+    from lsdo_utils.api import PowerCombinationComp, LinearCombinationComp, \
+        GeneralOperationComp, ElementwiseMaxComp
+
+    shape = (2, 3, 4)
+
+    def get_comps():
+        return [
+            PowerCombinationComp(
+                shape=shape,
+                out_name='a',
+                powers_dict=dict(x=2., y=-1.),
+                coeff=3.,
+            ),
+            LinearCombinationComp(
+                shape=shape,
+                out_name='b',
+                coeffs_dict=dict(a=2., z=-1.),
+                constant=1.,
+            ),
+            GeneralOperationComp(
+                shape=shape,
+                out_name='c',
+                expr='sin(b) * x',
+            ),
+            ElementwiseMaxComp(
+                shape=shape,
+                in_names=['b', 'c'],
+                out_name='f',
+                rho=20.,
+            ),
+        ]
+
+    prob = Problem()
+
+    comp = IndepVarComp()
+    comp.add_output('x', np.random.rand(*shape) + 0.5)
+    comp.add_output('y', np.random.rand(*shape) + 0.5)
+    comp.add_output('z', np.random.rand(*shape) + 0.5)
+    prob.model.add_subsystem('inputs_comp', comp, promotes=['*'])
+
+    comp = FusedArrayComp(
+        shape=shape,
+        comps=get_comps(),
+    )
+    prob.model.add_subsystem('fused_comp', comp, promotes=['*'])
+
+    comp = FusedArrayComp(
+        shape=shape,
+        comps=get_comps(),
+        out_names=['b', 'f'],
+        matrix_free=True,
+    )
+    prob.model.add_subsystem('fused_matrix_free_comp', comp, promotes_inputs=['*'],
+        promotes_outputs=[('b', 'b2'), ('f', 'f2')])
+
+    prob.setup(force_alloc_complex=True)
+    prob.run_model()
+    prob.check_partials(compact_print=True)
+
+    x, y, z = prob['x'], prob['y'], prob['z']
+    b = 2. * 3. * x ** 2 / y - z + 1.
+    c = np.sin(b) * x
+    f = np.log(np.exp(20. * b) + np.exp(20. * c)) / 20.
+    print(b - prob['b2'])
+    print(f - prob['f'])
+    print(f - prob['f2'])
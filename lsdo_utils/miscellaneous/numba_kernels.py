@@ -0,0 +1,251 @@
+"""
+Optional Numba kernels for the arithmetic, aggregation and B-spline code.
+
+The kernels are only used when numba is installed and they are enabled, either globally
+with set_numba_enabled or the LSDO_UTILS_NUMBA=1 environment variable, or per component
+with its use_numba option; otherwise the NumPy code runs, so numba is never required.
+They are compiled in parallel (prange) and cached on disk, so the JIT cost is only paid
+on the first run. They are only used for real float64 arrays: complex step goes through
+the NumPy code. The log-sum-exp and KS kernels are bound by exp, which NumPy vectorizes
+better, so ElementwiseMaxComp and KSComp only use them when their use_numba option is set.
+"""
+import os
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+if numba is not None:
+    jit = numba.njit(parallel=True, cache=True)
+    inline_jit = numba.njit(cache=True, inline='always')
+    prange = numba.prange
+else:
+    def jit(func):
+        return func
+    inline_jit = jit
+    prange = range
+
+
+numba_options = dict(
+    enabled=os.environ.get('LSDO_UTILS_NUMBA') == '1',
+    chunk_size=1024,
+)
+
+
+def set_numba_enabled(enabled=True):
+    numba_options['enabled'] = enabled
+
+
+def get_use_numba(use_numba, *arrays):
+    """
+    Whether to run a kernel on the given arrays, with use_numba a component option that
+    overrides the global setting unless it is None.
+    """
+    if numba is None:
+        return False
+
+    if use_numba is None:
+        use_numba = numba_options['enabled']
+
+    return use_numba and all(np.asarray(array).dtype == np.float64 for array in arrays)
+
+
+@inline_jit
+def power(x, p):
+    # Scalar power with the same fast paths as np.power for common exponents.
+    if p == 1.:
+        return x
+    elif p == 2.:
+        return x * x
+    elif p == 3.:
+        return x * x * x
+    elif p == 0.5:
+        return np.sqrt(x)
+    elif p == -0.5:
+        return 1. / np.sqrt(x)
+    elif p == -1.:
+        return 1. / x
+    elif p == -2.:
+        return 1. / (x * x)
+    elif p == 0.:
+        return 1.
+    return x ** p
+
+
+@jit
+def power_combination_kernel(arrays, powers, coeff, out, powered):
+    # out = coeff * prod_i arrays[i] ** powers[i], with the powers stored in powered for the
+    # partials. arrays is a tuple, so the inputs are not copied.
+    num_inputs = len(arrays)
+    for j in prange(out.shape[0]):
+        value = coeff[j]
+        for i in range(num_inputs):
+            powered[i, j] = power(arrays[i][j], powers[i])
+            value *= powered[i, j]
+        out[j] = value
+
+
+@jit
+def power_combination_partials_kernel(arrays, powers, coeff, powered, derivs):
+    # derivs[i] = coeff * prod_{k < i} x_k ** p_k * p_i x_i ** (p_i - 1) * prod_{k > i} ...,
+    # from the powers computed by power_combination_kernel, with the prefix products stored
+    # in derivs and the suffix product accumulated.
+    num_inputs = len(arrays)
+    for j in prange(coeff.shape[0]):
+        prefix = coeff[j]
+        for i in range(num_inputs):
+            derivs[i, j] = prefix
+            prefix *= powered[i, j]
+
+        suffix = 1.
+        for i in range(num_inputs - 1, -1, -1):
+            p = powers[i]
+            if p == 0.:
+                derivs[i, j] = 0.
+            else:
+                derivs[i, j] *= suffix * p * power(arrays[i][j], p - 1.)
+                suffix *= powered[i, j]
+
+
+@jit
+def linear_power_combination_kernel(tables, value_rows, coeffs, chunk_size, out):
+    # out = sum_t coeffs[t] * prod_v tables[value_rows[t, v]], by chunks of elements so that
+    # the innermost loops are contiguous.
+    num_terms, num_vars = value_rows.shape
+    size = tables.shape[1]
+    num_chunks = (size + chunk_size - 1) // chunk_size
+    for chunk in prange(num_chunks):
+        start = chunk * chunk_size
+        stop = min(start + chunk_size, size)
+        term = np.empty(stop - start)
+
+        out[start:stop] = 0.
+        for t in range(num_terms):
+            term[:] = coeffs[t]
+            for v in range(num_vars):
+                row = value_rows[t, v]
+                for j in range(start, stop):
+                    term[j - start] *= tables[row, j]
+            for j in range(start, stop):
+                out[j] += term[j - start]
+
+
+@jit
+def linear_power_combination_partials_kernel(
+        tables, value_rows, deriv_rows, deriv_coeffs, chunk_size, derivs):
+    # derivs[v] = sum_t deriv_coeffs[t, v] * (factors before v) * tables[deriv_rows[t, v]]
+    # * (factors after v), with the suffix products of each term in a chunk-sized work array.
+    num_terms, num_vars = value_rows.shape
+    size = tables.shape[1]
+    num_chunks = (size + chunk_size - 1) // chunk_size
+    for chunk in prange(num_chunks):
+        start = chunk * chunk_size
+        stop = min(start + chunk_size, size)
+        suffixes = np.empty((num_vars + 1, stop - start))
+        prefix = np.empty(stop - start)
+
+        derivs[:, start:stop] = 0.
+        for t in range(num_terms):
+            suffixes[num_vars] = 1.
+            for v in range(num_vars - 1, -1, -1):
+                row = value_rows[t, v]
+                for j in range(start, stop):
+                    suffixes[v, j - start] = suffixes[v + 1, j - start] * tables[row, j]
+
+            prefix[:] = 1.
+            for v in range(num_vars):
+                coeff = deriv_coeffs[t, v]
+                row = deriv_rows[t, v]
+                if coeff != 0.:
+                    for j in range(start, stop):
+                        derivs[v, j] += coeff * prefix[j - start] * tables[row, j] \
+                            * suffixes[v + 1, j - start]
+
+                row = value_rows[t, v]
+                for j in range(start, stop):
+                    prefix[j - start] *= tables[row, j]
+
+
+@jit
+def log_sum_exp_kernel(stacked, rho, sign, out, weights):
+    # Smooth maximum (or minimum, with sign -1) over the first axis of stacked, by the
+    # stabilized log-sum-exp, with the softmax weights, which are the partials.
+    num_inputs, size = stacked.shape
+    for j in prange(size):
+        fmax = sign * stacked[0, j]
+        for i in range(1, num_inputs):
+            fmax = max(fmax, sign * stacked[i, j])
+
+        arg = 0.
+        for i in range(num_inputs):
+            weights[i, j] = np.exp(rho * (sign * stacked[i, j] - fmax))
+            arg += weights[i, j]
+
+        for i in range(num_inputs):
+            weights[i, j] /= arg
+        out[j] = sign * (fmax + np.log(arg) / rho)
+
+
+@jit
+def ks_kernel(array, rho, sign, out):
+    # KS aggregation of each row of a 2-D array.
+    num_rows, num_cols = array.shape
+    for m in prange(num_rows):
+        fmax = sign * array[m, 0]
+        for k in range(1, num_cols):
+            fmax = max(fmax, sign * array[m, k])
+
+        arg = 0.
+        for k in range(num_cols):
+            arg += np.exp(rho * (sign * array[m, k] - fmax))
+        out[m] = sign * (fmax + np.log(arg) / rho)
+
+
+@jit
+def ks_partials_kernel(array, ks, rho, sign, derivs):
+    num_rows, num_cols = array.shape
+    for m in prange(num_rows):
+        for k in range(num_cols):
+            derivs[m, k] = np.exp(sign * rho * (array[m, k] - ks[m]))
+
+
+@jit
+def bspline_bases_kernel(knots, t_vec, i0, order, bases):
+    # Cox-de Boor recursion point by point. bases has shape (num_levels, num_pt, order): with
+    # one level, only the final basis is stored; with order levels, level l holds the basis
+    # of degree l, as needed for the derivatives.
+    num_levels = bases.shape[0]
+    for p in prange(t_vec.shape[0]):
+        t = t_vec[p]
+        basis = bases[num_levels - 1, p]
+        basis[:] = 0.
+        basis[order - 1] = 1.
+        if num_levels > 1:
+            bases[0, p, :] = basis
+
+        for i in range(2, order + 1):
+            l = i - 1
+            j1 = order - l
+            j2 = order
+
+            n = i0[p] + j1
+            den = knots[n + l] - knots[n]
+            basis[j1 - 1] = (knots[n + l] - t) / den * basis[j1] if den != 0. else 0.
+            for j in range(j1 + 1, j2):
+                n = i0[p] + j
+                den = knots[n + l - 1] - knots[n - 1]
+                value = (t - knots[n - 1]) / den * basis[j - 1] if den != 0. else 0.
+                den = knots[n + l] - knots[n]
+                if den != 0.:
+                    value += (knots[n + l] - t) / den * basis[j]
+                basis[j - 1] = value
+            n = i0[p] + j2
+            den = knots[n + l - 1] - knots[n - 1]
+            basis[j2 - 1] = (t - knots[n - 1]) / den * basis[j2 - 1] if den != 0. else 0.
+
+            if num_levels > 1 and l < order - 1:
+                bases[l, p, :] = basis
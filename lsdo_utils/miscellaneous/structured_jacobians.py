@@ -0,0 +1,154 @@
+import numpy as np
+import scipy.sparse
+
+from lsdo_utils.miscellaneous_functions.get_grid_indices import get_grid_indices
+
+
+class StructuredJacobian(object):
+    """
+    Jacobian described by its structure rather than by explicit rows and cols.
+
+    The nonzeros are enumerated over a grid of shape grid_shape. The rows and cols are the
+    flat indices into the output and the input formed by the grid axes row_axes and
+    col_axes; they are only built when requested, and are shared between all Jacobians
+    with the same structure. Values are a scalar or an array over the grid, in any shape
+    of the right size. The products apply_fwd and apply_rev work from the rows and cols
+    for any such structure, and are overridden by the subclasses.
+    """
+
+    in_shape = ()
+    out_shape = ()
+    grid_shape = ()
+    row_axes = ()
+    col_axes = ()
+
+    @property
+    def rows(self):
+        return get_grid_indices(self.grid_shape, self.row_axes)
+
+    @property
+    def cols(self):
+        return get_grid_indices(self.grid_shape, self.col_axes)
+
+    def get_coo_matrix(self, val=1.):
+        val = np.broadcast_to(self._get_val(val), self.grid_shape).flatten()
+        return scipy.sparse.coo_matrix(
+            (val, (self.rows, self.cols)),
+            shape=(int(np.prod(self.out_shape)), int(np.prod(self.in_shape))),
+        )
+
+    def _get_val(self, val):
+        if np.size(val) == 1:
+            return np.reshape(val, ())
+        else:
+            return np.reshape(val, self.grid_shape)
+
+    def apply_fwd(self, d_in, val=1.):
+        # Generic product, by scattering over the rows and cols; the subclasses replace it
+        # with array operations that follow their structure.
+        val = np.broadcast_to(self._get_val(val), self.grid_shape).reshape(-1)
+        d_in = np.reshape(d_in, -1)
+
+        d_out = np.zeros(int(np.prod(self.out_shape)), np.result_type(val, d_in))
+        np.add.at(d_out, self.rows, val * d_in[self.cols])
+        return d_out.reshape(self.out_shape)
+
+    def apply_rev(self, d_out, val=1.):
+        val = np.broadcast_to(self._get_val(val), self.grid_shape).reshape(-1)
+        d_out = np.reshape(d_out, -1)
+
+        d_in = np.zeros(int(np.prod(self.in_shape)), np.result_type(val, d_out))
+        np.add.at(d_in, self.cols, val * d_out[self.rows])
+        return d_in.reshape(self.in_shape)
+
+
+class DiagonalJacobian(StructuredJacobian):
+    """
+    Elementwise Jacobian of an output and an input of the same shape.
+    """
+
+    def __init__(self, shape):
+        self.in_shape = self.out_shape = self.grid_shape = tuple(shape)
+        self.row_axes = self.col_axes = tuple(range(len(shape)))
+
+    def apply_fwd(self, d_in, val=1.):
+        return self._get_val(val) * np.reshape(d_in, self.grid_shape)
+
+    def apply_rev(self, d_out, val=1.):
+        return self._get_val(val) * np.reshape(d_out, self.grid_shape)
+
+
+class BroadcastJacobian(StructuredJacobian):
+    """
+    Jacobian of an output of the given shape with respect to an input that is broadcast
+    along axes, i.e., the input has the shape with these axes removed.
+    """
+
+    def __init__(self, shape, axes):
+        rank = len(shape)
+        axes = tuple(axis % rank for axis in axes)
+        kept_axes = tuple(axis for axis in range(rank) if axis not in axes)
+
+        self.axes = axes
+        self.out_shape = self.grid_shape = tuple(shape)
+        self.in_shape = tuple(shape[axis] for axis in kept_axes)
+        self.broadcast_shape = tuple(1 if axis in axes else shape[axis] for axis in range(rank))
+        self.row_axes = tuple(range(rank))
+        self.col_axes = kept_axes
+
+    def apply_fwd(self, d_in, val=1.):
+        return np.broadcast_to(
+            self._get_val(val) * np.reshape(d_in, self.broadcast_shape), self.out_shape)
+
+    def apply_rev(self, d_out, val=1.):
+        return np.sum(
+            self._get_val(val) * np.reshape(d_out, self.out_shape), axis=self.axes,
+        ).reshape(self.in_shape)
+
+
+class ReductionJacobian(StructuredJacobian):
+    """
+    Jacobian of an output that reduces an input of the given shape along axes; this is the
+    transpose of BroadcastJacobian.
+    """
+
+    def __init__(self, shape, axes):
+        self.broadcast = BroadcastJacobian(shape, axes)
+
+        self.in_shape = self.grid_shape = self.broadcast.out_shape
+        self.out_shape = self.broadcast.in_shape
+        self.row_axes = self.broadcast.col_axes
+        self.col_axes = self.broadcast.row_axes
+
+    def apply_fwd(self, d_in, val=1.):
+        return self.broadcast.apply_rev(d_in, val)
+
+    def apply_rev(self, d_out, val=1.):
+        return self.broadcast.apply_fwd(d_out, val)
+
+
+class PermutationJacobian(StructuredJacobian):
+    """
+    Jacobian of a reshape-transpose-reshape of the input: the input is viewed with shape
+    in_elem_shape, its axes are permuted by perm, and the result is viewed as out_shape.
+    """
+
+    def __init__(self, in_elem_shape, perm, in_shape=None, out_shape=None):
+        self.in_elem_shape = tuple(in_elem_shape)
+        self.perm = tuple(perm)
+        self.inv_perm = tuple(np.argsort(perm))
+        self.out_elem_shape = tuple(self.in_elem_shape[axis] for axis in self.perm)
+
+        self.in_shape = self.in_elem_shape if in_shape is None else tuple(in_shape)
+        self.out_shape = self.out_elem_shape if out_shape is None else tuple(out_shape)
+        self.grid_shape = self.out_elem_shape
+        self.row_axes = tuple(range(len(perm)))
+        self.col_axes = self.inv_perm
+
+    def apply_fwd(self, d_in, val=1.):
+        d_out = np.reshape(d_in, self.in_elem_shape).transpose(self.perm)
+        return (self._get_val(val) * d_out).reshape(self.out_shape)
+
+    def apply_rev(self, d_out, val=1.):
+        d_in = self._get_val(val) * np.reshape(d_out, self.out_elem_shape)
+        return d_in.transpose(self.inv_perm).reshape(self.in_shape)
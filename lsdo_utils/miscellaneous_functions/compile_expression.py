@@ -0,0 +1,477 @@
+import ast
+
+import numpy as np
+
+try:
+    import numexpr
+except ImportError:
+    numexpr = None
+
+
+binary_ops = {
+    ast.Add: 'add',
+    ast.Sub: 'sub',
+    ast.Mult: 'mul',
+    ast.Div: 'div',
+    ast.Pow: 'pow',
+}
+
+unary_funcs = [
+    'sin', 'cos', 'tan', 'arcsin', 'arccos', 'arctan', 'sinh', 'cosh', 'tanh',
+    'exp', 'log', 'log10', 'sqrt', 'abs', 'sign',
+]
+
+constants = {
+    'pi': np.pi,
+    'e': np.e,
+}
+
+def _real_abs(x, out=None):
+    # abs with the sign taken from the real part, which is complex-step safe, unlike the
+    # modulus.
+    if out is None:
+        return np.where(np.real(x) < 0, -x, x)[()]
+
+    np.copyto(out, x)
+    return np.negative(x, out=out, where=np.real(x) < 0)
+
+
+def _real_sign(x, out=None):
+    # sign of the real part, the derivative of _real_abs.
+    return np.sign(np.real(x), out=out)
+
+
+numpy_funcs = {
+    'add': np.add,
+    'sub': np.subtract,
+    'mul': np.multiply,
+    'div': np.divide,
+    'pow': np.power,
+    'neg': np.negative,
+}
+numpy_funcs.update({name: getattr(np, name) for name in unary_funcs})
+numpy_funcs.update({
+    'abs': _real_abs,
+    'sign': _real_sign,
+})
+
+numexpr_formats = {
+    'add': '({} + {})',
+    'sub': '({} - {})',
+    'mul': '({} * {})',
+    'div': '({} / {})',
+    'pow': '({} ** {})',
+    'neg': '(-{})',
+    'sign': '(where({0} > 0, 1., where({0} < 0, -1., 0.)))',
+}
+
+
+class ExpressionGraph(object):
+    """
+    Hash-consed expression DAG: structurally identical subexpressions are a single node,
+    so common subexpressions of the value and of all the derivatives are shared.
+
+    A node is an integer id into self.nodes, where each entry is a tuple (op, *args) with
+    args either node ids or, for 'const', 'var' and function calls, plain values. Children
+    always have smaller ids than their parents, so ascending ids are a topological order.
+    """
+
+    def __init__(self):
+        self.nodes = []
+        self.ids = {}
+        self.derivs = {}
+
+    def _add(self, key):
+        if key not in self.ids:
+            self.ids[key] = len(self.nodes)
+            self.nodes.append(key)
+        return self.ids[key]
+
+    def get_const_value(self, node):
+        key = self.nodes[node]
+        return key[1] if key[0] == 'const' else None
+
+    def const(self, value):
+        return self._add(('const', float(value)))
+
+    def var(self, name):
+        return self._add(('var', name))
+
+    def add(self, a, b):
+        va, vb = self.get_const_value(a), self.get_const_value(b)
+        if va is not None and vb is not None:
+            return self.const(va + vb)
+        if va == 0.:
+            return b
+        if vb == 0.:
+            return a
+        return self._add(('add',) + tuple(sorted((a, b))))
+
+    def sub(self, a, b):
+        va, vb = self.get_const_value(a), self.get_const_value(b)
+        if va is not None and vb is not None:
+            return self.const(va - vb)
+        if vb == 0.:
+            return a
+        if va == 0.:
+            return self.neg(b)
+        if a == b:
+            return self.const(0.)
+        return self._add(('sub', a, b))
+
+    def mul(self, a, b):
+        va, vb = self.get_const_value(a), self.get_const_value(b)
+        if va is not None and vb is not None:
+            return self.const(va * vb)
+        if va == 0. or vb == 0.:
+            return self.const(0.)
+        if va == 1.:
+            return b
+        if vb == 1.:
+            return a
+        if va == -1.:
+            return self.neg(b)
+        if vb == -1.:
+            return self.neg(a)
+        return self._add(('mul',) + tuple(sorted((a, b))))
+
+    def div(self, a, b):
+        va, vb = self.get_const_value(a), self.get_const_value(b)
+        if va is not None and vb is not None:
+            return self.const(va / vb)
+        if va == 0.:
+            return self.const(0.)
+        if vb == 1.:
+            return a
+        if vb is not None:
+            return self.mul(a, self.const(1. / vb))
+        return self._add(('div', a, b))
+
+    def pow(self, a, b):
+        va, vb = self.get_const_value(a), self.get_const_value(b)
+        if va is not None and vb is not None:
+            return self.const(va ** vb)
+        if vb == 0.:
+            return self.const(1.)
+        if vb == 1.:
+            return a
+        return self._add(('pow', a, b))
+
+    def neg(self, a):
+        key = self.nodes[a]
+        if key[0] == 'const':
+            return self.const(-key[1])
+        if key[0] == 'neg':
+            return key[1]
+        return self._add(('neg', a))
+
+    def call(self, func, a):
+        va = self.get_const_value(a)
+        if va is not None:
+            return self.const(numpy_funcs[func](va))
+        return self._add((func, a))
+
+    def parse(self, expr, in_names):
+        """
+        Parse an expression string into a node, with in_names the allowed variable names.
+        """
+        def visit(tree):
+            if isinstance(tree, ast.Expression):
+                return visit(tree.body)
+            elif isinstance(tree, ast.BinOp) and type(tree.op) in binary_ops:
+                op = binary_ops[type(tree.op)]
+                return getattr(self, op)(visit(tree.left), visit(tree.right))
+            elif isinstance(tree, ast.UnaryOp) and isinstance(tree.op, ast.USub):
+                return self.neg(visit(tree.operand))
+            elif isinstance(tree, ast.UnaryOp) and isinstance(tree.op, ast.UAdd):
+                return visit(tree.operand)
+            elif isinstance(tree, ast.Constant) and isinstance(tree.value, (int, float)) \
+                    and not isinstance(tree.value, bool):
+                return self.const(tree.value)
+            elif isinstance(tree, ast.Name):
+                if tree.id in in_names:
+                    return self.var(tree.id)
+                elif tree.id in constants:
+                    return self.const(constants[tree.id])
+                raise ValueError('Unknown variable {} in {}'.format(tree.id, expr))
+            elif isinstance(tree, ast.Call) and isinstance(tree.func, ast.Name) \
+                    and tree.func.id in unary_funcs and len(tree.args) == 1 \
+                    and not tree.keywords:
+                return self.call(tree.func.id, visit(tree.args[0]))
+            raise ValueError('Unsupported syntax {} in {}'.format(ast.dump(tree), expr))
+
+        return visit(ast.parse(expr, mode='eval'))
+
+    def deriv(self, node, name):
+        """
+        Node of the derivative of a node with respect to the variable name.
+        """
+        if (node, name) in self.derivs:
+            return self.derivs[node, name]
+
+        key = self.nodes[node]
+        op = key[0]
+
+        if op == 'const':
+            result = self.const(0.)
+        elif op == 'var':
+            result = self.const(1. if key[1] == name else 0.)
+        else:
+            a = key[1]
+            da = self.deriv(a, name)
+            if op in ['add', 'sub', 'mul', 'div', 'pow']:
+                b = key[2]
+                db = self.deriv(b, name)
+
+            if op == 'add':
+                result = self.add(da, db)
+            elif op == 'sub':
+                result = self.sub(da, db)
+            elif op == 'mul':
+                result = self.add(self.mul(da, b), self.mul(a, db))
+            elif op == 'div':
+                # (da - (a / b) * db) / b, reusing this node for a / b.
+                result = self.div(self.sub(da, self.mul(node, db)), b)
+            elif op == 'pow':
+                vb = self.get_const_value(b)
+                if vb is not None:
+                    result = self.mul(
+                        self.mul(self.const(vb), self.pow(a, self.const(vb - 1.))), da)
+                else:
+                    result = self.mul(node, self.add(
+                        self.mul(db, self.call('log', a)),
+                        self.div(self.mul(b, da), a),
+                    ))
+            elif op == 'neg':
+                result = self.neg(da)
+            else:
+                result = self.mul(self._get_func_deriv(op, a, node), da)
+
+        self.derivs[node, name] = result
+        return result
+
+    def _get_func_deriv(self, func, a, node):
+        one = self.const(1.)
+
+        if func == 'sin':
+            return self.call('cos', a)
+        elif func == 'cos':
+            return self.neg(self.call('sin', a))
+        elif func == 'tan':
+            return self.add(one, self.mul(node, node))
+        elif func == 'arcsin':
+            return self.div(one, self.call('sqrt', self.sub(one, self.mul(a, a))))
+        elif func == 'arccos':
+            return self.neg(self.div(one, self.call('sqrt', self.sub(one, self.mul(a, a)))))
+        elif func == 'arctan':
+            return self.div(one, self.add(one, self.mul(a, a)))
+        elif func == 'sinh':
+            return self.call('cosh', a)
+        elif func == 'cosh':
+            return self.call('sinh', a)
+        elif func == 'tanh':
+            return self.sub(one, self.mul(node, node))
+        elif func == 'exp':
+            return node
+        elif func == 'log':
+            return self.div(one, a)
+        elif func == 'log10':
+            return self.div(self.const(1. / np.log(10.)), a)
+        elif func == 'sqrt':
+            return self.div(self.const(0.5), node)
+        elif func == 'abs':
+            return self.call('sign', a)
+        elif func == 'sign':
+            return self.const(0.)
+
+
+class CompiledExpression(object):
+    """
+    Value and first derivatives of an expression string, evaluated together.
+
+    The value and the derivatives with respect to every variable are nodes of one
+    hash-consed graph, so shared subexpressions are evaluated once. With numexpr, every
+    node that is used more than once, or is a result, is computed by one fused numexpr
+    kernel into a preallocated buffer, with single-use subexpressions inlined. Without it,
+    every node is one NumPy ufunc call into a preallocated scratch buffer, with buffers
+    reused once their node is no longer needed.
+    """
+
+    def __init__(self, expr, in_names, size, backend=None):
+        if backend is None:
+            backend = 'numexpr' if numexpr is not None else 'numpy'
+        elif backend == 'numexpr' and numexpr is None:
+            raise ImportError('The numexpr backend requires numexpr to be installed')
+
+        self.expr = expr
+        self.in_names = list(in_names)
+        self.size = size
+        self.backend = backend
+
+        graph = ExpressionGraph()
+        value = graph.parse(expr, self.in_names)
+        derivs = [graph.deriv(value, in_name) for in_name in self.in_names]
+
+        self.graph = graph
+        self.results = [value] + derivs
+
+        # Nodes needed for the results, in topological order, and their use counts.
+        needed = set()
+        stack = list(self.results)
+        while stack:
+            node = stack.pop()
+            if node not in needed:
+                needed.add(node)
+                stack.extend(self._get_children(node))
+        self.order = sorted(needed)
+
+        self.num_uses = {node: 0 for node in self.order}
+        for node in self.order:
+            for child in self._get_children(node):
+                self.num_uses[child] += 1
+
+        # The NumPy kernels are always set up since complex inputs use them: the complex
+        # inverse trigonometric functions of numexpr are not accurate enough for complex step.
+        self._setup_numpy()
+        if backend == 'numexpr':
+            self._setup_numexpr()
+
+        # Buffers keyed by dtype for complex step.
+        self.buffers = {}
+
+    def _get_children(self, node):
+        key = self.graph.nodes[node]
+        if key[0] in ['const', 'var']:
+            return []
+        return list(key[1:])
+
+    def _is_leaf(self, node):
+        return self.graph.nodes[node][0] in ['const', 'var']
+
+    def _setup_numpy(self):
+        # Assign scratch buffers by liveness: a buffer is freed after the last use of its
+        # node, unless the node is a result.
+        last_use = {}
+        for index, node in enumerate(self.order):
+            for child in self._get_children(node):
+                last_use[child] = index
+
+        results = set(self.results)
+        free = []
+        self.num_numpy_buffers = 0
+        self.numpy_buffer_index = {}
+        for index, node in enumerate(self.order):
+            if self._is_leaf(node):
+                continue
+
+            for child in set(self._get_children(node)):
+                if child in self.numpy_buffer_index and child not in results \
+                        and last_use[child] == index:
+                    free.append(self.numpy_buffer_index[child])
+
+            if free:
+                self.numpy_buffer_index[node] = free.pop()
+            else:
+                self.numpy_buffer_index[node] = self.num_numpy_buffers
+                self.num_numpy_buffers += 1
+
+    def _setup_numexpr(self):
+        results = set(self.results)
+        self.materialized = [
+            node for node in self.order
+            if not self._is_leaf(node) and (node in results or self.num_uses[node] > 1)
+        ]
+        buffer_index = {node: index for index, node in enumerate(self.materialized)}
+
+        def get_string(node, top=False):
+            key = self.graph.nodes[node]
+            op = key[0]
+
+            if op == 'const':
+                return '({!r})'.format(key[1])
+            elif op == 'var':
+                return 'v{}'.format(self.in_names.index(key[1]))
+            elif node in buffer_index and not top:
+                return 't{}'.format(buffer_index[node])
+
+            args = [get_string(child) for child in key[1:]]
+            if op in numexpr_formats:
+                return numexpr_formats[op].format(*args)
+            return '{}({})'.format(op, args[0])
+
+        self.kernels = [get_string(node, top=True) for node in self.materialized]
+
+    def _get_buffers(self, dtype, num_buffers):
+        if dtype not in self.buffers:
+            self.buffers[dtype] = np.empty((num_buffers, self.size), dtype)
+        return self.buffers[dtype]
+
+    def evaluate(self, arrays):
+        """
+        Evaluate the value and the derivatives, given a list of flat input arrays.
+
+        Returns a list of the value followed by the derivative with respect to each input;
+        each is a flat array, possibly a view of an input or of a reused buffer, or a float
+        if it is constant.
+        """
+        dtype = np.result_type(*arrays)
+        use_numexpr = self.backend == 'numexpr' and not np.issubdtype(dtype, np.complexfloating)
+
+        values = {}
+        for node in self.order:
+            key = self.graph.nodes[node]
+            if key[0] == 'const':
+                values[node] = key[1]
+            elif key[0] == 'var':
+                values[node] = arrays[self.in_names.index(key[1])]
+
+        if use_numexpr:
+            buffers = self._get_buffers(dtype, len(self.materialized))
+            local_dict = {'v{}'.format(index): array for index, array in enumerate(arrays)}
+            for index, (node, kernel) in enumerate(zip(self.materialized, self.kernels)):
+                numexpr.evaluate(kernel, local_dict=local_dict, out=buffers[index])
+                local_dict['t{}'.format(index)] = values[node] = buffers[index]
+        else:
+            buffers = self._get_buffers(dtype, self.num_numpy_buffers)
+            for node in self.order:
+                key = self.graph.nodes[node]
+                if key[0] in ['const', 'var']:
+                    continue
+
+                out = buffers[self.numpy_buffer_index[node]]
+                args = [values[child] for child in key[1:]]
+                numpy_funcs[key[0]](*args, out=out)
+                values[node] = out
+
+        return [values[node] for node in self.results]
+
+
+def get_expression_names(expr):
+    """
+    Variable names of an expression string, in order of first appearance from left to
+    right, e.g., ['x', 'y', 'z'] for '0.5*x*y**2*z'.
+    """
+    names = []
+
+    def visit(tree):
+        if isinstance(tree, ast.Name):
+            if tree.id not in unary_funcs and tree.id not in constants \
+                    and tree.id not in names:
+                names.append(tree.id)
+        for child in ast.iter_child_nodes(tree):
+            visit(child)
+
+    visit(ast.parse(expr, mode='eval'))
+    return names
+
+
+def compile_expression(expr, in_names=None, size=1, backend=None):
+    """
+    Compile an expression string, e.g., '0.5*rho*v**2*S*CL', for inputs of the given flat
+    size; in_names defaults to the variables of the expression. backend is 'numexpr',
+    'numpy', or None to use numexpr when it is installed.
+    """
+    if in_names is None:
+        in_names = get_expression_names(expr)
+
+    return CompiledExpression(expr, in_names, size, backend)
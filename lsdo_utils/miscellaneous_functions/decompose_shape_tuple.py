@@ -1,5 +1,11 @@
+import string
+
+
 def decompose_shape_tuple(shape, select_indices):
-    alphabet = 'abcdefghij'
+    alphabet = string.ascii_letters
+
+    if len(shape) > len(alphabet):
+        raise ValueError('Shape {} has more than {} axes'.format(shape, len(alphabet)))
 
     einsum_selection = ''
     einsum_full = ''
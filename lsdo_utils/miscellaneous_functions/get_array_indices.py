@@ -1,5 +1,7 @@
 import numpy as np
 
+from lsdo_utils.miscellaneous_functions.get_grid_indices import get_grid_indices
+
 
 def get_array_indices(*shape):
-    return np.arange(np.prod(shape)).reshape(shape)
\ No newline at end of file
+    return get_grid_indices(shape).reshape(shape).astype(int)
@@ -0,0 +1,79 @@
+from collections import OrderedDict
+
+import numpy as np
+
+
+# Memoized index arrays keyed by (shape, axes), least recently used first, and the bound on
+# their total size.
+_grid_indices_cache = OrderedDict()
+max_grid_indices_cache_bytes = 2 ** 27
+
+
+def get_index_dtype(size):
+    """
+    Smallest integer dtype, int32 or int64, that can index an array of the given size.
+    """
+    if size <= np.iinfo(np.int32).max:
+        return np.dtype(np.int32)
+    else:
+        return np.dtype(np.int64)
+
+
+def _get_grid_indices(shape, axes):
+    rank = len(shape)
+    sub_shape = tuple(shape[axis] for axis in axes)
+    dtype = get_index_dtype(max(int(np.prod(shape)), int(np.prod(sub_shape))))
+
+    indices = np.zeros((1,) * rank, dtype)
+    stride = 1
+    for axis in reversed(axes):
+        broadcast_shape = [1] * rank
+        broadcast_shape[axis] = shape[axis]
+        indices = indices + np.arange(shape[axis], dtype=dtype).reshape(broadcast_shape) * stride
+        stride *= shape[axis]
+
+    indices = np.broadcast_to(indices, shape).flatten()
+    indices.flags.writeable = False
+    return indices
+
+
+def get_grid_indices(shape, axes=None):
+    """
+    Flat indices into a sub-array, for every point of a grid of the given shape.
+
+    The sub-array has the grid axes listed in axes, in that order, so its shape is
+    tuple(shape[axis] for axis in axes); the grid axes not in axes are broadcast. With
+    axes=None, the result is the flattened arange over the grid; with axes=(), it is all
+    zeros. For instance, the rows of the Jacobian of a sum over axis 1 of a (2, 3, 4) array
+    are get_grid_indices((2, 3, 4), (0, 2)).
+
+    Indices are computed by stride arithmetic, use int32 when the size allows, and are
+    memoized as read-only arrays, so components with the same shapes share one copy. The
+    memoized arrays are evicted, least recently used first, once their total size exceeds
+    max_grid_indices_cache_bytes; an array larger than that is not memoized at all.
+    """
+    shape = tuple(int(size) for size in shape)
+    rank = len(shape)
+
+    if axes is None:
+        axes = tuple(range(rank))
+    else:
+        axes = tuple(int(axis) % rank if rank else int(axis) for axis in axes)
+
+    if len(set(axes)) != len(axes) or any(axis >= rank for axis in axes):
+        raise ValueError('Invalid axes {} for shape {}'.format(axes, shape))
+
+    key = (shape, axes)
+    if key in _grid_indices_cache:
+        _grid_indices_cache.move_to_end(key)
+        return _grid_indices_cache[key]
+
+    indices = _get_grid_indices(shape, axes)
+
+    _grid_indices_cache[key] = indices
+    num_bytes = sum(array.nbytes for array in _grid_indices_cache.values())
+    while num_bytes > max_grid_indices_cache_bytes:
+        _, evicted = _grid_indices_cache.popitem(last=False)
+        num_bytes -= evicted.nbytes
+
+    return indices
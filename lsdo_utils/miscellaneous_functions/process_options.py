@@ -21,7 +21,7 @@ def get_scalars_list(scalars, names):
         scalars = [scalars] * len(names)
     elif isinstance(scalars, (list)):
         pass
-    elif isinstance(np.ndarray):
+    elif isinstance(scalars, np.ndarray):
         scalars = list(scalars)
-        
+
     return scalars
\ No newline at end of file